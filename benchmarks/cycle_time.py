@@ -0,0 +1,279 @@
+"""
+Runs test files on the simulated instruments and reports where the cycle time
+goes, per step and in total:
+- wall: time from the step start to its validation
+- nominal: time the step is meant to last (CC duration)
+- overhead: wall - nominal
+- transactions: IT8700 transactions and Arduino frames
+- link: time spent on the simulated serial links
+- wait: time the step delays spent counting down (engine thread asleep)
+- idle: time the monitor spent waiting for its next reading tick
+- blocking: time the engine thread (the GUI thread in the app) spent running
+  tasks instead of waiting for them, and its longest task
+- late: how late the step delay completed past its deadline
+and, per run, how late the monitor reading ticks fired and how many were missed
+
+Usage:
+    python -m benchmarks.cycle_time [test_file.yaml ...] [--latency S]
+        [--arduino-latency S] [--repeat N] [--json FILE] [--max-overhead S]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+from time import monotonic
+
+import yaml
+
+from controllers.arduino_controller import ArduinoController
+from controllers.sat_controller import ElectronicLoadController
+from headless import HeadlessRunner
+from models.test_file_model import TestData
+from simulators.arduino import SimulatedArduinoSerial
+from simulators.it8700 import DEFAULT_LATENCY, SimulatedIT8700, SimulatedSupply
+from utils.enums import SequenceEvent
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "tests")
+
+
+@dataclass
+class StepTiming:
+    description: str
+    nominal: float
+    passed: bool = False
+    wall: float = 0.0
+    transactions: int = 0
+    arduino_frames: int = 0
+    link_time: float = 0.0
+    wait_time: float = 0.0
+    idle_time: float = 0.0
+    blocking_time: float = 0.0
+    max_task_time: float = 0.0
+    delay_overshoot: float | None = None
+
+    @property
+    def overhead(self) -> float:
+        return self.wall - self.nominal
+
+
+class BenchmarkRunner(HeadlessRunner):
+    """
+    HeadlessRunner on the simulators, timing every task of the engine thread and
+    taking a snapshot of the counters at every step boundary.
+    """
+
+    def __init__(self, test: TestData, latency: float, arduino_latency: float):
+        self.load_simulator = SimulatedIT8700(simulated_supplies(test), latency)
+        self.arduino_simulator = SimulatedArduinoSerial(arduino_latency)
+        self.steps: list[StepTiming] = []
+        self.step_start: dict = {}
+        self.blocking_time = 0.0
+        self.max_task_time = 0.0
+        self.finish_time = None
+        self.tick_jitter: dict | None = None
+        super().__init__(
+            test,
+            ElectronicLoadController(self.load_simulator),
+            ArduinoController(self.arduino_simulator),
+        )
+        self.timer.on_completed = self.timed(self.timer.on_completed)
+
+    def timed(self, task):
+        def run(*args):
+            start = monotonic()
+            try:
+                task(*args)
+            finally:
+                elapsed = monotonic() - start
+                self.blocking_time += elapsed
+                self.max_task_time = max(self.max_task_time, elapsed)
+
+        return run
+
+    def execute_task(self, task, *args):
+        self.timed(task)(*args)
+
+    def counters(self) -> dict:
+        return {
+            "wall": monotonic(),
+            "transactions": self.load_simulator.transactions,
+            "arduino_frames": self.arduino_simulator.frames,
+            "link_time": self.load_simulator.link_time
+            + self.arduino_simulator.link_time,
+            "wait_time": self.timer.wait_time,
+            "idle_time": self.monitoring_worker.idle_time,
+            "blocking_time": self.blocking_time,
+        }
+
+    def on_sequence_event(self, event: SequenceEvent, *args):
+        match event:
+            case SequenceEvent.STEP_STARTED:
+                step = self.engine.get_steps()[args[0]]
+                self.steps.append(StepTiming(step.description, step.duration))
+                self.step_start = self.counters()
+                self.step_start["delays"] = self.timer.overshoot_stats.count
+                self.max_task_time = 0.0
+            case SequenceEvent.STEP_FINISHED:
+                timing = self.steps[-1]
+                for name, value in self.counters().items():
+                    setattr(timing, name, value - self.step_start[name])
+                timing.max_task_time = self.max_task_time
+                if self.timer.overshoot_stats.count > self.step_start["delays"]:
+                    timing.delay_overshoot = self.timer.overshoot / 1000
+                timing.passed = args[0]
+            case SequenceEvent.SEQUENCE_FINISHED:
+                # Excludes the buzzer and the workers shutdown.
+                self.finish_time = monotonic()
+                jitter = self.monitoring_worker.jitter_stats
+                self.tick_jitter = {
+                    "mean": jitter.mean,
+                    "max": jitter.max,
+                    "skipped": self.monitoring_worker.skipped_ticks,
+                }
+        super().on_sequence_event(event, *args)
+
+    def log(self, text: str):
+        pass
+
+    def wait_operator(self):
+        pass
+
+
+def simulated_supplies(test: TestData) -> dict[int, SimulatedSupply]:
+    """
+    Returns a supply per active channel that passes the test: the output sits in
+    the middle of its voltage band and limits in the middle of its load band,
+    taken from the first step configuring the channel.
+    """
+    supplies = {}
+    for step in test.steps:
+        for channel_id, params in step.channels_configuration.items():
+            if channel_id in supplies:
+                continue
+            supplies[channel_id] = SimulatedSupply(
+                nominal_voltage=(params.voltage_lower + params.voltage_upper) / 2,
+                current_limit=(params.load_lower + params.load_upper) / 2,
+                resistance=0.0,
+            )
+    return supplies
+
+
+def run_benchmark(
+    test_file: str, latency: float, arduino_latency: float
+) -> tuple[list[StepTiming], float, dict | None]:
+    with open(test_file, "r") as loaded_file:
+        test = TestData(**yaml.safe_load(loaded_file.read()))
+    runner = BenchmarkRunner(test, latency, arduino_latency)
+    start = monotonic()
+    runner.run("00000001", "benchmark")
+    total = (runner.finish_time or monotonic()) - start
+    return runner.steps, total, runner.tick_jitter
+
+
+def print_report(
+    test_file: str,
+    steps: list[StepTiming],
+    total: float,
+    tick_jitter: dict | None = None,
+) -> None:
+    print(f"\n{os.path.basename(test_file)}")
+    print(
+        f"{'Step':<24}{'Wall':>8}{'Nominal':>9}{'Overhead':>10}"
+        f"{'SCPI':>6}{'Ard.':>6}{'Link':>8}{'Wait':>8}{'Idle':>8}{'Block':>8}{'Max':>8}{'Late':>8}"
+        f"  Status"
+    )
+    for step in steps:
+        print(
+            f"{step.description[:23]:<24}{step.wall:>8.3f}{step.nominal:>9.3f}"
+            f"{step.overhead:>10.3f}{step.transactions:>6}{step.arduino_frames:>6}"
+            f"{step.link_time:>8.3f}{step.wait_time:>8.3f}{step.idle_time:>8.3f}"
+            f"{step.blocking_time:>8.3f}"
+            f"{step.max_task_time * 1000:>6.1f}ms"
+            f"{late_ms(step.delay_overshoot):>8}  {'PASS' if step.passed else 'FAIL'}"
+        )
+    nominal = sum(step.nominal for step in steps)
+    print(
+        f"{'Total':<24}{total:>8.3f}{nominal:>9.3f}{total - nominal:>10.3f}"
+        f"{sum(step.transactions for step in steps):>6}"
+        f"{sum(step.arduino_frames for step in steps):>6}"
+        f"{sum(step.link_time for step in steps):>8.3f}"
+        f"{sum(step.wait_time for step in steps):>8.3f}"
+        f"{sum(step.idle_time for step in steps):>8.3f}"
+        f"{sum(step.blocking_time for step in steps):>8.3f}"
+    )
+    overshoots = [
+        step.delay_overshoot for step in steps if step.delay_overshoot is not None
+    ]
+    if overshoots:
+        print(
+            f"Step delays late: mean {sum(overshoots) / len(overshoots) * 1000:.1f} ms,"
+            f" max {max(overshoots) * 1000:.1f} ms"
+        )
+    if tick_jitter is not None:
+        print(
+            f"Reading ticks late: mean {tick_jitter['mean'] * 1000:.1f} ms,"
+            f" max {tick_jitter['max'] * 1000:.1f} ms,"
+            f" {tick_jitter['skipped']} skipped"
+        )
+
+
+def late_ms(seconds: float | None) -> str:
+    return "---" if seconds is None else f"{seconds * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures the test cycle time on simulated instruments."
+    )
+    parser.add_argument(
+        "test_files",
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(TESTS_DIR, "*.yaml"))),
+    )
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY)
+    parser.add_argument("--arduino-latency", type=float, default=DEFAULT_LATENCY)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Writes the results to this file")
+    parser.add_argument(
+        "--max-overhead",
+        type=float,
+        help="Fails when a run's total overhead exceeds this many seconds",
+    )
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for test_file in args.test_files:
+        for _ in range(args.repeat):
+            steps, total, tick_jitter = run_benchmark(
+                test_file, args.latency, args.arduino_latency
+            )
+            print_report(test_file, steps, total, tick_jitter)
+            overhead = total - sum(step.nominal for step in steps)
+            if args.max_overhead is not None and overhead > args.max_overhead:
+                print(f"Overhead {overhead:.3f} s > {args.max_overhead} s")
+                failed = True
+            results.append(
+                {
+                    "test_file": test_file,
+                    "latency": args.latency,
+                    "total": total,
+                    "overhead": overhead,
+                    "tick_jitter": tick_jitter,
+                    "steps": [
+                        asdict(step) | {"overhead": step.overhead} for step in steps
+                    ],
+                }
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
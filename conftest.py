@@ -0,0 +1,2 @@
+# Puts the repository root on sys.path, so tests/ imports the application
+# modules however pytest is invoked.
@@ -1,23 +1,39 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from time import sleep
 
 import pyvisa
 
+from simulators.backend import create_arduino_simulator
 from utils.arduino_interface import Arduino
 
 # Default instrument path for Arduino.
 ARDU_INST_PATH = "ASRL/dev/ttyACM0::INSTR"
+BUZZER_PIN = "10"
+BUZZER_DURATION = 0.5
 
 
 class ArduinoController:
     """
     Used to control the connection with Arduino and run commands using pyduino interface.
+    Commands run in order on a single worker thread, every public command returns a
+    Future that completes once the firmware acknowledged it.
+    Runs on simulator (a serial peer) when one is given or the simulated backend
+    is selected (see simulators.backend).
     """
 
-    def __init__(self):
+    def __init__(self, simulator=None):
         self.rm = pyvisa.ResourceManager()
         self.arduino = None
-        if ARDU_INST_PATH in self.rm.list_resources():
-            self.arduino = Arduino()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arduino")
+        if simulator is None:
+            simulator = create_arduino_simulator()
+        if simulator is not None:
+            self.arduino = Arduino(conn=simulator)
+        elif ARDU_INST_PATH in self.rm.list_resources():
+            try:
+                self.arduino = Arduino()
+            except ConnectionError:
+                self.arduino = None
 
         self.output_pins = {
             "4": False,
@@ -29,6 +45,10 @@ class ArduinoController:
         }
         self.input_pins = ["3"]
         self.active_input_source = 0
+        self.input_source_future = None
+
+        if self.arduino is not None:
+            self.executor.submit(self._setup_pin_modes)
 
     def check_connection(self) -> bool:
         """
@@ -37,23 +57,24 @@ class ArduinoController:
         """
         return True if self.arduino is not None else False
 
-    def set_active_pin(self, reset: bool) -> None:
+    def _setup_pin_modes(self) -> None:
+        self.arduino.set_port_mode([*self.output_pins, BUZZER_PIN], "O")
+
+    def set_active_pin(self, reset: bool) -> Future:
         """
         Receives a reset(bool) value, if reset is true, set all pins to off,
          else sets any true value pin in output_pins(dict) to on.
-        No return.
+        Returns a Future completed when the pins were written.
         """
-        for pin in self.output_pins:
-            if self.output_pins[pin]:
-                self.arduino.set_pin_mode(pin, "O")
-                sleep(0.3)
-                if reset:
-                    self.arduino.digital_write(pin, 0)
-                else:
-                    self.arduino.digital_write(pin, 1)
-            sleep(0.2)
-
-    def set_input_source(self, input_source: int, input_type: str) -> None:
+        pin_values = {
+            pin: 0 if reset else int(self.output_pins[pin]) for pin in self.output_pins
+        }
+        future = self.executor.submit(self.arduino.port_write, pin_values)
+        if reset:
+            self.track_input_source(future, 0)
+        return future
+
+    def set_input_source(self, input_source: int, input_type: str) -> Future:
         """
         - Pino 4: CA1
         - Pino 5: CA2
@@ -62,33 +83,60 @@ class ArduinoController:
         - Pino 8: CC2
         - Pino 9: CC3
         - Pino 10: Buzzer
+        Returns a Future completed when the new source is connected.
+        active_input_source reads 0 (unknown) until the write succeeded, so a
+        failed or pending write never skips the next request.
         """
         if self.active_input_source == input_source:
-            return
+            return completed_future()
 
+        future = completed_future()
         match input_source:
             case 1:
-                self.change_output("4" if input_type == "CA" else "7")
+                future = self.change_output("4" if input_type == "CA" else "7")
             case 2:
-                self.change_output("5" if input_type == "CA" else "8")
+                future = self.change_output("5" if input_type == "CA" else "8")
             case 3:
-                self.change_output("6" if input_type == "CA" else "9")
-        self.active_input_source = input_source
+                future = self.change_output("6" if input_type == "CA" else "9")
+        self.track_input_source(future, input_source)
+        return future
+
+    def track_input_source(self, future: Future, input_source: int) -> None:
+        self.active_input_source = 0
+        self.input_source_future = future
 
-    def change_output(self, active_pin: str) -> None:
+        def update(done: Future) -> None:
+            # Runs on the worker thread, a later write supersedes this one.
+            if done is not self.input_source_future:
+                return
+            if not done.cancelled() and done.exception() is None:
+                self.active_input_source = input_source
+
+        future.add_done_callback(update)
+
+    def change_output(self, active_pin: str) -> Future:
         """
         Receives active_pin(str) and set its equivalent value to true in output_pins(dict).
-        No return.
+        The old source is disconnected and the new one connected in a single frame.
+        Returns a Future completed when the output was switched.
         """
-        self.set_active_pin(True)
         for pin in self.output_pins:
             self.output_pins[pin] = pin == active_pin
-        self.set_active_pin(False)
-
-    def buzzer(self) -> bool:
-        self.arduino.set_pin_mode("10", "O")
-        sleep(0.5)
-        self.arduino.digital_write("10", 1)
-        sleep(0.5)
-        self.arduino.digital_write("10", 0)
-        return True
+        return self.set_active_pin(False)
+
+    def buzzer(self) -> Future:
+        return self.executor.submit(self._beep)
+
+    def _beep(self) -> None:
+        self.arduino.digital_write(BUZZER_PIN, 1)
+        sleep(BUZZER_DURATION)
+        self.arduino.digital_write(BUZZER_PIN, 0)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def completed_future() -> Future:
+    future = Future()
+    future.set_result(None)
+    return future
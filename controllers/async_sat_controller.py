@@ -0,0 +1,142 @@
+import asyncio
+
+import serial
+
+from utils.scpi_commands import *
+
+# Default serial port of the USB/RS-232 adapter (same device as DEFAULT_INST_PATH).
+DEFAULT_SERIAL_PORT = "/dev/ttyUSB0"
+
+
+class AsyncElectronicLoadController:
+    """
+    asyncio counterpart of ElectronicLoadController.
+    The serial port is opened in non-blocking mode and read from the event loop,
+    so awaiting an instrument operation never blocks other coroutines.
+    Queries are serialized by a lock and bounded by timeout seconds.
+    Standalone prototype, the application drives the load with
+    ElectronicLoadController on the instrument thread (InstrumentWorker).
+    """
+
+    def __init__(
+        self,
+        port: str = DEFAULT_SERIAL_PORT,
+        baud_rate: int = 115200,
+        timeout: float = 2.0,
+    ):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.conn = None
+        self.conn_status = False
+        self.inst_id = ""
+        self.active_channel = 0
+        self.lock = asyncio.Lock()
+        self.responses: asyncio.Queue[str] = asyncio.Queue()
+        self.rx_buffer = bytearray()
+        self.resync_pending = False
+
+    async def connect(self) -> None:
+        self.conn = serial.Serial(self.port, self.baud_rate, timeout=0)
+        asyncio.get_running_loop().add_reader(self.conn.fileno(), self._on_readable)
+        self.conn_status = True
+        self.inst_id = (await self._sat_query(INST_ID)).strip()
+        await self._sat_write(SYSTEM_REMOTE)
+        await self._sat_write(CLEAR_STATUS)
+
+    async def close(self) -> None:
+        if self.conn is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        self.conn.close()
+        self.conn = None
+        self.conn_status = False
+
+    def _on_readable(self) -> None:
+        self.rx_buffer += self.conn.read(self.conn.in_waiting or 1)
+        while b"\n" in self.rx_buffer:
+            line, _, self.rx_buffer = self.rx_buffer.partition(b"\n")
+            self.responses.put_nowait(line.decode().strip())
+
+    def _send(self, command: str) -> None:
+        # Messages are a few bytes long, the kernel buffer takes them at once.
+        self.conn.write(f"{command}\n".encode())
+
+    async def _sat_write(self, command: str) -> None:
+        async with self.lock:
+            self._send(command)
+
+    async def _sat_query(self, command: str) -> str:
+        async with self.lock:
+            return await self._exchange(command)
+
+    async def _exchange(self, command: str) -> str:
+        """
+        Sends command and waits up to timeout seconds for its answer, must be
+        called holding the lock.
+        Raises asyncio.TimeoutError when the instrument does not reply.
+        """
+        if self.resync_pending:
+            await self._resync()
+        while not self.responses.empty():
+            self.responses.get_nowait()
+        self._send(command)
+        try:
+            return await asyncio.wait_for(self.responses.get(), self.timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # The reply may still arrive, it must not answer the next query.
+            self.resync_pending = True
+            raise
+
+    async def _resync(self) -> None:
+        """
+        Drops the late replies of timed out or cancelled queries, however many
+        arrive: replies carry no tag, so INST_ID is sent as a marker and every
+        line before its answer is discarded.
+        Raises asyncio.TimeoutError when the marker is not answered, the resync
+        is then retried by the next exchange.
+        """
+        self._send(INST_ID)
+        while True:
+            line = await asyncio.wait_for(self.responses.get(), self.timeout)
+            if line == self.inst_id:
+                break
+        self.resync_pending = False
+
+    def _with_channel(self, channel_id: int, command: str) -> str:
+        # Select and command travel in one message, so no other coroutine can
+        # switch the active channel in between.
+        if self.active_channel == channel_id:
+            return command
+        self.active_channel = channel_id
+        return f"{SELECT_CHANNEL}{channel_id};:{command}"
+
+    async def _channel_write(self, channel_id: int, command: str) -> None:
+        async with self.lock:
+            self._send(self._with_channel(channel_id, command))
+
+    async def _channel_query(self, channel_id: int, command: str) -> str:
+        async with self.lock:
+            return await self._exchange(self._with_channel(channel_id, command))
+
+    async def select_channel(self, channel_id: int) -> None:
+        async with self.lock:
+            if self.active_channel == channel_id:
+                return
+            self.active_channel = channel_id
+            self._send(f"{SELECT_CHANNEL}{channel_id}")
+
+    async def toggle_active_channels_input(
+        self, channels: list[int], state: bool
+    ) -> None:
+        for channel in channels:
+            await self._channel_write(channel, INPUT_ON if state else INPUT_OFF)
+
+    async def get_channel_value(self, channel_id: int) -> str:
+        return await self._channel_query(channel_id, FETCH_VOLT)
+
+    async def set_channel_current(self, channel_id: int, load: float) -> None:
+        await self._channel_write(channel_id, f"{SET_CURR}{load}")
+
+    async def toggle_short_mode(self, channel_id: int, state: bool) -> None:
+        await self._channel_write(channel_id, SHORT_ON if state else SHORT_OFF)
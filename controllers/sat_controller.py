@@ -1,42 +1,183 @@
-from time import sleep
+from dataclasses import asdict, dataclass
+from typing import Optional
 
 import pyvisa
 import pyvisa_py
+from pyvisa.errors import VisaIOError
 
+from simulators.backend import create_load_simulator
 from utils.scpi_commands import *
 
 # Default instrument path using a USB/RS-232 adapter.
 DEFAULT_INST_PATH = "ASRL/dev/ttyUSB0::INSTR"
 
+# Pipelined writes are flushed early once the joined message exceeds this length.
+MAX_MESSAGE_LENGTH = 200
+
+# Maps each measurement query to the ChannelReading field it fills.
+MEASUREMENT_FIELDS = {FETCH_VOLT: "voltage", FETCH_CURR: "current", FETCH_POW: "power"}
+
+
+@dataclass
+class ChannelReading:
+    voltage: Optional[float] = None
+    current: Optional[float] = None
+    power: Optional[float] = None
+
+
+@dataclass
+class ChannelState:
+    """
+    Last known setting of a channel, None when it is unknown to the controller.
+    """
+
+    current: Optional[float] = None
+    input_on: Optional[bool] = None
+    short_on: Optional[bool] = None
+    function: Optional[str] = None
+
 
 class ElectronicLoadController:
-    def __init__(self):
+    """
+    Controls the IT8700 on DEFAULT_INST_PATH, or on simulator (a resource with
+    the pyvisa write/query interface) when one is given or the simulated backend
+    is selected (see simulators.backend).
+    """
+
+    def __init__(self, simulator=None):
         self.rm = pyvisa.ResourceManager("@py")
+        self.simulator = simulator if simulator is not None else create_load_simulator()
         self.conn_status = False
         self.inst_id = ""
-        self.inst_resource = self.setup_connection()
         self.active_channel = 0
+        self.compound_supported = True
+        self.pending_writes: list[str] = []
+        self.channel_states: dict[int, ChannelState] = {}
+        self.inst_resource = self.setup_connection()
 
     def setup_connection(self):
-        if DEFAULT_INST_PATH in self.rm.list_resources():
+        if self.simulator is not None:
+            inst = self.simulator
+        elif DEFAULT_INST_PATH in self.rm.list_resources():
             inst = self.rm.open_resource(DEFAULT_INST_PATH)
+        else:
+            inst = None
+        if inst is not None:
             inst.baud_rate = 115200
             self.conn_status = True
             id_response = inst.query(INST_ID)
             self.inst_id = id_response.strip()
             inst.write(SYSTEM_REMOTE)
             inst.write(CLEAR_STATUS)
+            # The cached settings are kept, reconnect() verifies them.
+            self.active_channel = 0
 
             return inst
 
         return None
 
+    def reconnect(self) -> list[int]:
+        """
+        Reopens the connection and verifies the cached settings of every known
+        channel, the instrument may have been reset or power cycled meanwhile.
+        Returns the ids of the mismatched channels (see verify_state()).
+        """
+        if self.inst_resource is not None:
+            self.inst_resource.close()
+        self.pending_writes.clear()
+        self.conn_status = False
+        self.inst_resource = self.setup_connection()
+        if self.inst_resource is None:
+            return []
+        return self.verify_state(list(self.channel_states))
+
+    def invalidate_state(self) -> None:
+        self.active_channel = 0
+        self.channel_states.clear()
+
+    def get_channel_state(self, channel_id: int) -> ChannelState:
+        return self.channel_states.setdefault(channel_id, ChannelState())
+
+    def verify_state(self, channel_ids: list[int]) -> list[int]:
+        """
+        Reads back the settings of every channel in channel_ids and replaces the
+        cached ones with them, settings never written are populated as well.
+        Returns the ids of the channels with a known setting that did not match
+        the instrument.
+        """
+        mismatched = []
+        for channel_id in channel_ids:
+            self.select_channel(channel_id)
+            actual = ChannelState(
+                current=float(self._sat_query(GET_CURR)),
+                input_on=bool(int(self._sat_query(GET_INPUT))),
+                short_on=bool(int(self._sat_query(GET_SHORT))),
+                function=self._sat_query(GET_FUNC).strip().upper(),
+            )
+            cached = asdict(self.get_channel_state(channel_id))
+            if any(
+                value is not None and value != getattr(actual, setting)
+                for setting, value in cached.items()
+            ):
+                mismatched.append(channel_id)
+            self.channel_states[channel_id] = actual
+        return mismatched
+
     def _sat_write(self, command: str) -> None:
-        self.inst_resource.write(command)
+        """
+        Queues command in the write pipeline, it is only sent on the next flush(),
+        query or when the pipeline grows past MAX_MESSAGE_LENGTH.
+        """
+        self.pending_writes.append(command)
+        if (
+            not self.compound_supported
+            or len(join_commands(self.pending_writes)) > MAX_MESSAGE_LENGTH
+        ):
+            self.flush()
 
     def _sat_query(self, command: str) -> str:
+        self.flush()
         return self.inst_resource.query(command)
 
+    def _channel_write(
+        self, channel_id: int, setting: str, value, command: str
+    ) -> None:
+        """
+        Writes a channel scoped command and records value as the channel setting,
+        skipping the write when the cached setting already holds that value.
+        """
+        state = self.get_channel_state(channel_id)
+        if getattr(state, setting) == value:
+            return
+        self.select_channel(channel_id)
+        self._sat_write(command)
+        setattr(state, setting, value)
+
+    def flush(self) -> None:
+        """
+        Sends every pipelined write, as a single terminated line when the
+        instrument accepts compound messages.
+        """
+        if not self.pending_writes:
+            return
+        commands, self.pending_writes = self.pending_writes, []
+        try:
+            if self.compound_supported:
+                self.inst_resource.write(join_commands(commands))
+            else:
+                for command in commands:
+                    self.inst_resource.write(command)
+        except VisaIOError:
+            # Unknown how much of the message was applied.
+            self.invalidate_state()
+            raise
+
+    def wait_complete(self) -> None:
+        """
+        Blocks until the instrument has executed every command sent so far.
+        """
+        self._sat_query(OPERATION_COMPLETE)
+
     def select_channel(self, channel_id: int) -> None:
         if self.active_channel == channel_id:
             return
@@ -45,18 +186,111 @@ class ElectronicLoadController:
 
     def toggle_active_channels_input(self, channels: list[int], state: bool) -> None:
         for channel in channels:
-            self.select_channel(channel)
-            self._sat_write(INPUT_ON if state else INPUT_OFF)
+            self._channel_write(
+                channel, "input_on", state, INPUT_ON if state else INPUT_OFF
+            )
 
     def get_channel_value(self, channel_id: int) -> str:
         self.select_channel(channel_id)
         return self._sat_query(FETCH_VOLT)
 
-    def set_channel_current(self, channel_id: int, load: float) -> None:
-        self.select_channel(channel_id)
-        self._sat_write(f"{SET_CURR}{load}")
-        sleep(0.1)
+    def get_channels_values(
+        self,
+        channel_ids: list[int],
+        queries: tuple[str, ...] = (FETCH_VOLT, FETCH_CURR, FETCH_POW),
+    ) -> dict[int, ChannelReading]:
+        """
+        Fetches the given measurement queries for every channel in channel_ids.
+        Uses a single compound SCPI message when the instrument accepts it, otherwise
+        falls back (for the rest of the session) to one transaction per query.
+        Returns a dict of channel_id -> ChannelReading.
+        """
+        if not channel_ids:
+            return {}
+        if self.compound_supported:
+            try:
+                return self._compound_fetch(channel_ids, queries)
+            except (VisaIOError, ValueError):
+                self.compound_supported = False
+                self.active_channel = 0
+                self._sat_write(CLEAR_STATUS)
+
+        readings = {}
+        for channel_id in channel_ids:
+            self.select_channel(channel_id)
+            values = [self._sat_query(query) for query in queries]
+            readings[channel_id] = parse_reading(queries, values)
+        return readings
+
+    def _compound_fetch(
+        self, channel_ids: list[int], queries: tuple[str, ...]
+    ) -> dict[int, ChannelReading]:
+        # e.g. CHAN 1;:FETC:VOLT?;:CHAN 3;:FETC:VOLT? -> "12.01;5.02"
+        message = join_commands(
+            [
+                command
+                for channel_id in channel_ids
+                for command in (f"{SELECT_CHANNEL}{channel_id}", *queries)
+            ]
+        )
+        values = self._sat_query(message).strip().split(";")
+        if len(values) != len(channel_ids) * len(queries):
+            raise ValueError(f"Unexpected compound response: {values}")
+        self.active_channel = channel_ids[-1]
+
+        size = len(queries)
+        return {
+            channel_id: parse_reading(queries, values[i * size : (i + 1) * size])
+            for i, channel_id in enumerate(channel_ids)
+        }
+
+    def set_channel_current(
+        self, channel_id: int, load: float, wait_complete: bool = False
+    ) -> None:
+        self._channel_write(channel_id, "current", load, f"{SET_CURR}{load}")
+        if wait_complete:
+            self.wait_complete()
 
     def toggle_short_mode(self, channel_id: int, state: bool) -> None:
-        self.select_channel(channel_id)
-        self._sat_write(SHORT_ON if state else SHORT_OFF)
+        self._channel_write(
+            channel_id, "short_on", state, SHORT_ON if state else SHORT_OFF
+        )
+
+    def set_function_mode(self, channel_id: int, function: str) -> None:
+        """
+        Receives function as the mode mnemonic, e.g. "CURR" for constant current.
+        """
+        self._channel_write(channel_id, "function", function, f"{SET_FUNC}{function}")
+
+
+def join_commands(commands: list[str]) -> str:
+    """
+    Chains commands into one SCPI message, e.g. ["CHAN 1", "INP 1", "*OPC?"]
+    -> "CHAN 1;:INP 1;*OPC?". Every subsystem command restarts from the root.
+    """
+    return ";".join(
+        command if index == 0 or command.startswith("*") else f":{command}"
+        for index, command in enumerate(commands)
+    )
+
+
+def parse_reading(queries: tuple[str, ...], values: list[str]) -> ChannelReading:
+    return ChannelReading(
+        **{
+            MEASUREMENT_FIELDS[query]: float(value)
+            for query, value in zip(queries, values)
+        }
+    )
+
+
+def merge_readings(old: ChannelReading | None, new: ChannelReading) -> ChannelReading:
+    """
+    Returns new with the measurements it lacks taken from old.
+    """
+    if old is None:
+        return new
+    return ChannelReading(
+        voltage=old.voltage if new.voltage is None else new.voltage,
+        current=old.current if new.current is None else new.current,
+        power=old.power if new.power is None else new.power,
+    )
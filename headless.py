@@ -0,0 +1,230 @@
+import argparse
+import os
+import sys
+from queue import Empty, Queue
+from threading import Thread
+
+import yaml
+
+from controllers.arduino_controller import ArduinoController
+from controllers.sat_controller import ElectronicLoadController
+from models.test_file_model import TestData
+from utils.enums import SequenceEvent, TestState
+from utils.instrument_worker import InstrumentWorker
+from utils.monitor_worker import MonitorWorker
+from utils.report_file import (
+    ARCHIVE_FORMATS,
+    REPORT_WRITERS,
+    generate_reports,
+    save_report_files,
+)
+from utils.results_database import (
+    DEFAULT_DATABASE_PATH,
+    ResultsDatabase,
+    ResultsDatabaseError,
+)
+from utils.sequence_engine import SequenceEngine
+from utils.step_timer import StepTimer
+from utils.waveform_file import WAVEFORM_EXTENSION
+
+# Longest wait for a task before the step timer is polled again, in seconds.
+POLL_INTERVAL = 0.01
+
+
+class HeadlessSignal:
+    """
+    Stands in for a Qt Signal of WorkerSignals, emit() calls callback.
+    """
+
+    def __init__(self, callback):
+        self.emit = callback
+
+
+class HeadlessRunner:
+    """
+    Runs a test file on the instruments without the GUI, from a single thread
+    that executes the tasks queued by the workers and polls the step timer.
+    Also serves as the workers signals, emissions are queued as tasks.
+    """
+
+    def __init__(
+        self,
+        test: TestData,
+        sat_controller: ElectronicLoadController | None = None,
+        arduino_controller: ArduinoController | None = None,
+        results_database: ResultsDatabase | None = None,
+    ):
+        self.tasks = Queue()
+        self.sat_controller = sat_controller or ElectronicLoadController()
+        self.arduino_controller = arduino_controller or ArduinoController()
+        self.instrument_worker = InstrumentWorker(self.sat_controller, self)
+        self.monitoring_worker = MonitorWorker(self.instrument_worker)
+        self.monitoring_worker.pause()
+        self.timer = StepTimer(lambda: self.engine.on_delay_completed())
+        self.engine = SequenceEngine(
+            self.sat_controller,
+            self.arduino_controller,
+            self.instrument_worker,
+            self.monitoring_worker,
+            self.timer,
+            results_database,
+        )
+        self.readings_ready = HeadlessSignal(
+            lambda: self.tasks.put((self.on_readings_ready,))
+        )
+        self.instrument_error = HeadlessSignal(
+            lambda message: self.tasks.put((self.on_instrument_error, message))
+        )
+        self.result_data = None
+        self.engine.subscribe(self.on_sequence_event)
+        self.engine.load_test(test)
+
+    def run(
+        self,
+        serial_number: str,
+        operator: str,
+        step_index: int | None = None,
+        capture_path: str | None = None,
+    ):
+        """
+        Runs the sequence and returns the final TestState.
+        """
+        workers = [self.instrument_worker, self.monitoring_worker]
+        threads = [Thread(target=worker.run, daemon=True) for worker in workers]
+        for thread in threads:
+            thread.start()
+        try:
+            self.engine.start(serial_number, operator, step_index, capture_path)
+            while self.engine.active:
+                try:
+                    task, *args = self.tasks.get(timeout=POLL_INTERVAL)
+                except Empty:
+                    pass
+                else:
+                    self.execute_task(task, *args)
+                self.timer.poll()
+        finally:
+            self.monitoring_worker.stop()
+            self.instrument_worker.stop()
+            self.arduino_controller.close()
+            for thread in threads:
+                thread.join()
+        return self.engine.state
+
+    def execute_task(self, task, *args):
+        task(*args)
+
+    def log(self, text: str):
+        print(text)
+
+    def wait_operator(self):
+        # No operator to press ENTER, stdin stands in.
+        input()
+
+    def on_readings_ready(self):
+        self.engine.process_readings(self.instrument_worker.take_readings())
+
+    def on_instrument_error(self, message: str):
+        print(f"Falha de comunicação: {message}", file=sys.stderr)
+        self.engine.instrument_failed()
+
+    def on_sequence_event(self, event: SequenceEvent, *args):
+        match event:
+            case SequenceEvent.STATE_CHANGED:
+                self.log(f"{args[0]} {self.engine.state.value}".strip())
+                if self.engine.state is TestState.WAITKEY:
+                    self.wait_operator()
+                    self.tasks.put((self.engine.continue_step,))
+            case SequenceEvent.STEP_STARTED:
+                step = self.engine.get_steps()[args[0]]
+                self.log(f"[{args[0] + 1}] {step.description}")
+            case SequenceEvent.STEP_FINISHED:
+                self.log("PASS" if args[0] else "FAIL")
+            case SequenceEvent.INPUT_SOURCE_READY:
+                self.tasks.put((self.engine.start_step, *args))
+            case SequenceEvent.ERROR:
+                self.tasks.put((self.on_instrument_error, *args))
+            case SequenceEvent.RECORD_FAILED:
+                print(*args, file=sys.stderr)
+            case SequenceEvent.SEQUENCE_FINISHED:
+                self.result_data = args[0]
+                overshoot = self.timer.overshoot_stats
+                if overshoot.count:
+                    self.log(
+                        f"Atraso das etapas: média {overshoot.mean * 1000:.1f} ms,"
+                        f" máximo {overshoot.max * 1000:.1f} ms"
+                    )
+                jitter = self.monitoring_worker.jitter_stats
+                self.log(
+                    f"Atraso das leituras: média {jitter.mean * 1000:.1f} ms,"
+                    f" máximo {jitter.max * 1000:.1f} ms,"
+                    f" {self.monitoring_worker.skipped_ticks} perdidas"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs an IT8700 test file without the GUI."
+    )
+    parser.add_argument("test_file", help="Arquivo de teste (.yaml)")
+    parser.add_argument("serial_number")
+    parser.add_argument("--operator", default="")
+    parser.add_argument("--step", type=int, help="Runs only this step (1 based)")
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=sorted(REPORT_WRITERS),
+        help=f"Archived report format, repeatable (default: {', '.join(ARCHIVE_FORMATS)})",
+    )
+    parser.add_argument(
+        "--database",
+        default=DEFAULT_DATABASE_PATH,
+        help=f"Results database (default: {DEFAULT_DATABASE_PATH})",
+    )
+    parser.add_argument(
+        "--capture",
+        action="store_true",
+        help=f"Writes every sample to <serial_number>{WAVEFORM_EXTENSION} next to the report",
+    )
+    args = parser.parse_args()
+
+    with open(args.test_file, "r") as loaded_file:
+        test = TestData(**yaml.safe_load(loaded_file.read()))
+    directory = os.path.dirname(os.path.abspath(args.test_file))
+    serial_number = args.serial_number.zfill(8)
+    results_database = ResultsDatabase(args.database)
+    runner = HeadlessRunner(test, results_database=results_database)
+    try:
+        state = runner.run(
+            serial_number,
+            args.operator,
+            None if args.step is None else args.step - 1,
+            (
+                os.path.join(directory, serial_number + WAVEFORM_EXTENSION)
+                if args.capture
+                else None
+            ),
+        )
+    finally:
+        try:
+            results_database.close()
+        except ResultsDatabaseError as e:
+            print(e, file=sys.stderr)
+
+    if runner.result_data is not None:
+        archive_formats = args.format or ARCHIVE_FORMATS
+        reports = generate_reports(runner.result_data, ("text", *archive_formats))
+        print(reports["text"])
+        if state is TestState.PASSED and args.step is None:
+            save_report_files(
+                {
+                    report_format: reports[report_format]
+                    for report_format in archive_formats
+                },
+                os.path.join(directory, serial_number),
+            )
+    sys.exit(0 if state is TestState.PASSED else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import os
 import sys
-from time import sleep
 
 import yaml
-from PySide6.QtCore import QSize, Qt, QTimer, QThreadPool, Slot, Signal, QObject
+from PySide6.QtCore import QSize, Qt, QThread, Slot, Signal, QObject
 from PySide6.QtGui import (
     QAction,
     QIcon,
@@ -33,8 +32,13 @@ from controllers.sat_controller import ElectronicLoadController
 from models.test_file_model import *
 from utils.delay_manager import DelayManager
 from utils.enums import *
+from utils.instrument_worker import InstrumentWorker
 from utils.monitor_worker import MonitorWorker
 from utils.report_file import *
+from utils.results_database import ResultsDatabase, ResultsDatabaseError
+from utils.sequence_engine import SequenceEngine
+from utils.waveform_file import WAVEFORM_EXTENSION
+from utils.yield_statistics import ResultsQuery
 from utils.assets_res_path import resource_path
 from widgets.channel_monitor import ChannelMonitor
 from widgets.data_input_dialog import DataInputDialog
@@ -42,6 +46,7 @@ from widgets.steps_table import StepsTable
 from widgets.test_edit_view import TestEditView
 from widgets.test_result_view import TestResultView
 from widgets.test_setup_view import TestSetupView
+from widgets.yield_view import YieldView
 
 
 class CurrentTestSetup:
@@ -52,50 +57,67 @@ class CurrentTestSetup:
         self.operator_name: str = ""
         self.channels: list[ChannelMonitor] = []
         self.serial_number_changed: bool = False
-        self.is_single_step: bool = False
-        self.selected_step_index: int = -1
-        self.current_index: int = 0
-        self.test_result_data = dict()
-        self.test_sequence_status: list[bool] = []
 
     def set_next_serial_number(self):
         self.serial_number = str(int(self.serial_number) + 1).zfill(8)
 
-    def get_active_channel_ids(self) -> list[int]:
-        return list(map(lambda channel: channel.id, self.active_test.active_channels))
-
 
 class WorkerSignals(QObject):
-    update_output = Signal()
+    readings_ready = Signal()
+    instrument_error = Signal(str)
+    input_source_ready = Signal(object)
+
+
+class WorkerThread(QThread):
+    """
+    Dedicated thread of a long-lived worker, whose run() loops until stop().
+    A shared QThreadPool is sized by the CPU count, so on a single CPU host a
+    second endless runnable would never get a thread.
+    """
+
+    def __init__(self, worker):
+        super().__init__()
+        self.worker = worker
+
+    def run(self):
+        self.worker.run()
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.cl_channel_id = None
-        self.cl_step_params = None
-        self.current_load = None
-        self.cl_step_done = None
-        self.short_test_channel = None
-        self.short_test_cycle = None
-        self.short_test_params = None
-        self.shutdown_state = None
-        self.recovery_state = None
         self.test_setup = CurrentTestSetup()
-        self.state = TestState.NONE
         self.sat_controller = ElectronicLoadController()
         self.arduino_controller = ArduinoController()
-        self.thread_pool = QThreadPool()
         self.worker_signals = WorkerSignals()
+        self.instrument_worker = InstrumentWorker(
+            self.sat_controller, self.worker_signals
+        )
+        # Paused until a test sequence starts.
+        self.monitoring_worker = MonitorWorker(self.instrument_worker)
+        self.monitoring_worker.pause()
+        self.worker_threads = [
+            WorkerThread(self.instrument_worker),
+            WorkerThread(self.monitoring_worker),
+        ]
+        for worker_thread in self.worker_threads:
+            worker_thread.start()
         self.delay_manager = DelayManager()
+        self.results_database = ResultsDatabase()
+        self.engine = SequenceEngine(
+            self.sat_controller,
+            self.arduino_controller,
+            self.instrument_worker,
+            self.monitoring_worker,
+            self.delay_manager,
+            self.results_database,
+        )
         self.steps_table = StepsTable()
         self.steps_table.setVisible(False)
         self.test_result_view = TestResultView()
         self.test_edit_view = TestEditView(self)
         self.test_setup_view = TestSetupView(self.arduino_controller, self)
-        self.monitoring_worker = None
-        self.temp_file = None
-        self.temp_file_name = ""
+        self.yield_view = YieldView(ResultsQuery(self.results_database.path))
 
         self.setMinimumSize(QSize(1200, 600))
         self.setWindowTitle(
@@ -105,9 +127,12 @@ class MainWindow(QMainWindow):
         )
 
         # Signals
-        self.delay_manager.delay_completed.connect(self.on_delay_completed)
+        self.engine.subscribe(self.on_sequence_event)
+        self.delay_manager.delay_completed.connect(self.engine.on_delay_completed)
         self.delay_manager.remaining_time_changed.connect(self.update_timer)
-        self.worker_signals.update_output.connect(self.update_output_display)
+        self.worker_signals.readings_ready.connect(self.update_output_display)
+        self.worker_signals.instrument_error.connect(self.on_instrument_error)
+        self.worker_signals.input_source_ready.connect(self.engine.start_step)
 
         # Shortcuts
         self.start_shortcut = QShortcut(QKeySequence("Alt+R"), self)
@@ -136,6 +161,11 @@ class MainWindow(QMainWindow):
             QIcon(resource_path("assets/icons/settings.png")), "Configuração", self
         )
         self.test_setup_action.setEnabled(False)
+        self.capture_action = QAction("Capturar Formas de Onda", self)
+        self.capture_action.setCheckable(True)
+        self.yield_action = QAction(
+            QIcon(resource_path("assets/icons/description.png")), "Rendimento", self
+        )
 
         self.open_file_action.setShortcut(Qt.Key.Key_F3)
         self.test_result_action.setShortcut(Qt.Key.Key_F8)
@@ -146,6 +176,7 @@ class MainWindow(QMainWindow):
         self.edit_file_action.triggered.connect(lambda e: self.open_window(1))
         self.test_result_action.triggered.connect(self.test_result_view.show)
         self.test_setup_action.triggered.connect(lambda e: self.open_window(2))
+        self.yield_action.triggered.connect(self.yield_view.show)
 
         # Menu
         menu = self.menuBar()
@@ -157,6 +188,8 @@ class MainWindow(QMainWindow):
         test_menu = menu.addMenu("&Teste")
         test_menu.addAction(self.test_result_action)
         test_menu.addAction(self.test_setup_action)
+        test_menu.addAction(self.capture_action)
+        test_menu.addAction(self.yield_action)
 
         # Logo
         logo = QLabel()
@@ -263,8 +296,8 @@ class MainWindow(QMainWindow):
             case 2:
                 self.test_setup_view.showMaximized()
 
-    def start_test_sequence(self):
-        if self.state in [TestState.RUNNING, TestState.PAUSED, TestState.WAITKEY]:
+    def start_test_sequence(self, step_index: int | None = None):
+        if self.engine.active:
             return
         if not self.sat_controller.conn_status:
             show_custom_dialog(
@@ -284,208 +317,75 @@ class MainWindow(QMainWindow):
                 return
 
         if (
-            self.state is TestState.PASSED
-            and not self.test_setup.is_single_step
+            self.engine.state is TestState.PASSED
+            and step_index is None
             and not self.test_setup.serial_number_changed
         ):
             self.test_setup.set_next_serial_number()
             self.update_test_info()
 
-        # Start setup
-        self.test_setup.test_result_data.update(
-            group=self.test_setup.active_test.group,
-            model=self.test_setup.active_test.model,
-            customer=self.test_setup.active_test.customer,
-            operator=self.operator_name_value_field.text(),
-            serial_number=self.serial_number_value_field.text(),
-            steps=[],
-        )
-
-        self.sat_controller.toggle_active_channels_input(
-            self.test_setup.get_active_channel_ids(), True
-        )
-        if self.state is not TestState.NONE:
+        if self.engine.state is not TestState.NONE:
             self.steps_table.reset_table_status_fields()
 
         self.open_file_action.setDisabled(True)
         self.serial_number_value_field.setReadOnly(True)
         self.operator_name_value_field.setReadOnly(True)
-        self.state = TestState.RUNNING
-        self.test_setup.current_index = 0
-        self.update_status_label()
-        self.start_monitoring()
-        self.run_steps()
-
-    def toggle_test_pause(self):
-        if self.state not in [TestState.RUNNING, TestState.PAUSED]:
-            return
-        self.delay_manager.pause_resume()
-        self.state = (
-            TestState.RUNNING if self.state is TestState.PAUSED else TestState.PAUSED
-        )
-        self.update_status_label()
-
-    def cancel_test_sequence(self):
-        if self.state not in [TestState.RUNNING, TestState.PAUSED, TestState.WAITKEY]:
-            return
-
-        self.state = TestState.CANCELED
-        self.update_status_label()
-        self.reset_setup()
-
-    def run_steps(self):
-        if self.test_setup.is_single_step:
-            steps = [
-                self.test_setup.active_test.steps[self.test_setup.selected_step_index]
-            ]
-        else:
-            steps = self.test_setup.active_test.steps
-
-        if self.test_setup.current_index < len(steps):
-            step: Step = steps[self.test_setup.current_index]
-
-            if not self.test_setup.is_single_step:
-                self.steps_table.set_selected_step(self.test_setup.current_index)
-
-            self.arduino_controller.set_input_source(
-                step.input_source, self.test_setup.active_test.input_type
-            )
-
-            self.set_fixed_step_values(step)
-            match step.step_type:
-                case 1:
-                    self.cc_test_mode(step)
-                case 2:
-                    self.cl_test_mode(step)
-                case 3:
-                    self.short_test_mode(step)
-        else:
-            if self.temp_file:
-                self.temp_file.close()
-                os.remove(self.temp_file.name)
-
-            if self.state is not TestState.CANCELED:
-                self.state = (
-                    TestState.PASSED
-                    if False not in self.test_setup.test_sequence_status
-                    else TestState.FAILED
-                )
-            self.temp_file = generate_report_file(self.test_setup.test_result_data)
-            self.temp_file_name = self.temp_file.name
-            self.test_result_view.text = self.read_temp_file()
-
-            if self.state is TestState.PASSED and not self.test_setup.is_single_step:
-                with open(
-                    file=f"{self.test_setup.directory_path}{self.test_setup.serial_number}.txt",
-                    mode="w",
-                    encoding="utf-8",
-                ) as test_file:
-                    test_file.write(self.read_temp_file())
-
-            self.update_status_label()
-            self.reset_setup()
-
-    def cc_test_mode(self, step: Step):
-        for channel_id, params in step.channels_configuration.items():
-            self.update_current_load(channel_id, params.static_load)
-        if step.duration == 0:
-            self.state = TestState.WAITKEY
-            self.update_status_label(step.description)
-        else:
-            self.delay_manager.start_delay(step.duration * 1000)
-
-    def cl_test_mode(self, step: Step):
-        self.cl_step_done = False
-        self.cl_channel_id = self.test_setup.get_active_channel_ids()[0]
-        self.cl_step_params = step.channels_configuration.get(self.cl_channel_id)
-        self.current_load = self.cl_step_params.static_load
-        self.update_current_load(self.cl_channel_id, self.cl_step_params.static_load)
-        self.handle_increase_steps()
-
-    def handle_increase_steps(self):
-        if self.state is TestState.CANCELED:
-            return
-        channel = next(
-            (c for c in self.test_setup.channels if c.channel_id == self.cl_channel_id),
-            None,
-        )
-        if not self.cl_step_done:
-            if (
-                channel.data.voltage_output >= self.cl_step_params.voltage_under_limit
-                and self.current_load <= self.cl_step_params.end_load
-            ):
-                self.current_load += self.cl_step_params.increase_step
-                self.update_current_load(self.cl_channel_id, self.current_load)
-                QTimer.singleShot(
-                    int(self.cl_step_params.increase_delay * 1000),
-                    self.handle_increase_steps,
-                )
-            else:
-                self.update_current_load(
-                    self.cl_channel_id, self.cl_step_params.static_load
-                )
-                self.cl_step_done = True
-                QTimer.singleShot(100, self.handle_increase_steps)
-        else:
-            if channel.data.voltage_output <= self.cl_step_params.voltage_under_limit:
-                QTimer.singleShot(100, self.handle_increase_steps)
-            else:
-                self.validate_cl_step_values()
-                self.test_setup.current_index += 1
-                self.run_steps()
-
-    def short_test_mode(self, step: Step):
-        self.short_test_channel = self.test_setup.get_active_channel_ids()[0]
-        self.short_test_cycle = 0
-        self.short_test_params = step.channels_configuration.get(
-            self.short_test_channel
-        )
-        self.shutdown_state = False
-        self.recovery_state = False
-        self.sat_controller.toggle_short_mode(self.short_test_channel, True)
-        self.update_current_load(
-            self.short_test_channel, self.short_test_params.static_load
-        )
-        self.check_short_state()
-
-    def check_short_state(self):
-        voltage_shutdown_factor = 0.2
-        short_test_max_cycle = 30
-
-        if self.short_test_cycle >= short_test_max_cycle:
-            self.validade_short_test(False)
-            return
-        channel = next(
+        serial_number = self.serial_number_value_field.text()
+        self.engine.start(
+            serial_number,
+            self.operator_name_value_field.text(),
+            step_index,
             (
-                c
-                for c in self.test_setup.channels
-                if c.channel_id == self.short_test_channel
+                f"{self.test_setup.directory_path}{serial_number}{WAVEFORM_EXTENSION}"
+                if self.capture_action.isChecked()
+                else None
             ),
-            None,
         )
 
-        voltage_output = channel.data.voltage_output
-        voltage_lower = self.short_test_params.voltage_lower
-
-        if voltage_output < voltage_lower and self.short_test_cycle == 0:
-            QTimer.singleShot(500, self.check_short_state)
-            return
-
-        if (
-            not self.shutdown_state
-            and voltage_output < voltage_lower * voltage_shutdown_factor
-        ):
-            self.shutdown_state = True
-            self.sat_controller.toggle_short_mode(self.short_test_channel, False)
-
-        if self.shutdown_state and voltage_output > voltage_lower:
-            self.recovery_state = True
+    def toggle_test_pause(self):
+        self.engine.toggle_pause()
 
-        if self.recovery_state and self.shutdown_state:
-            self.validade_short_test(True)
-        else:
-            self.short_test_cycle += 1
-            QTimer.singleShot(500, self.check_short_state)
+    def cancel_test_sequence(self):
+        self.engine.cancel()
+
+    def on_sequence_event(self, event: SequenceEvent, *args):
+        match event:
+            case SequenceEvent.STATE_CHANGED:
+                self.update_status_label(*args)
+            case SequenceEvent.STEP_STARTED:
+                if not self.engine.is_single_step:
+                    self.steps_table.set_selected_step(*args)
+            case SequenceEvent.LIMITS_CHANGED:
+                self.set_fixed_step_values(*args)
+            case SequenceEvent.LOAD_CHANGED:
+                self.update_load_value(*args)
+            case SequenceEvent.INPUT_SOURCE_READY:
+                # Notified on the Arduino worker thread, the signal hands the step
+                # back to the GUI thread.
+                self.worker_signals.input_source_ready.emit(*args)
+            case SequenceEvent.ERROR:
+                self.worker_signals.instrument_error.emit(*args)
+            case SequenceEvent.STEP_FINISHED:
+                self.steps_table.set_step_status(*args)
+            case SequenceEvent.SEQUENCE_FINISHED:
+                self.save_test_report(*args)
+            case SequenceEvent.STOPPED:
+                self.reset_setup()
+            case SequenceEvent.RECORD_FAILED:
+                show_custom_dialog(self, *args, QMessageBox.Icon.Critical)
+
+    def save_test_report(self, result_data: dict):
+        reports = generate_reports(result_data, ("text", *ARCHIVE_FORMATS))
+        self.test_result_view.text = reports["text"]
+
+        if self.engine.state is TestState.PASSED and not self.engine.is_single_step:
+            save_report_files(
+                {
+                    report_format: reports[report_format]
+                    for report_format in ARCHIVE_FORMATS
+                },
+                f"{self.test_setup.directory_path}{self.test_setup.serial_number}",
+            )
 
     def set_fixed_step_values(self, step: Step):
         for monitor in self.test_setup.channels:
@@ -500,143 +400,44 @@ class MainWindow(QMainWindow):
                     ]
                 )
 
-    def on_delay_completed(self):
-        if self.state is not TestState.CANCELED:
-            self.validate_cc_step_values()
-            self.test_setup.current_index += 1
-            self.run_steps()
-
-    def validate_cc_step_values(self) -> None:
-        step_pass = True
-        current_step_data = []
-
-        for channel in self.test_setup.channels:
-            channel_data = {
-                "channel_id": str(channel.channel_id),
-                "voltage_output": channel.data.voltage_output,
-                "voltage_upper": channel.data.voltage_upper,
-                "voltage_lower": channel.data.voltage_lower,
-                "load": channel.data.load,
-                "power": channel.data.power,
-            }
-
-            current_step_data.append(channel_data)
-            if not (
-                channel.data.voltage_lower
-                <= channel.data.voltage_output
-                <= channel.data.voltage_upper
-            ):
-                step_pass = False
-
-        self.steps_table.set_step_status(step_pass)
-        self.test_setup.test_sequence_status.append(step_pass)
-        self.handle_test_data(tuple(current_step_data), step_pass)
-
-    def validate_cl_step_values(self) -> None:
-        step_pass = True
-        current_step_data = []
-
-        for channel in self.test_setup.channels:
-            channel_data = {
-                "channel_id": str(channel.channel_id),
-                "under_voltage": self.cl_step_params.voltage_under_limit,
-                "load_upper": channel.data.load_upper,
-                "load_lower": channel.data.load_lower,
-                "load": self.current_load,
-            }
-
-            current_step_data.append(channel_data)
-            if not (
-                channel.data.load_lower <= channel.data.load <= channel.data.load_upper
-            ):
-                step_pass = False
-
-        self.steps_table.set_step_status(step_pass)
-        self.test_setup.test_sequence_status.append(step_pass)
-        self.handle_test_data(tuple(current_step_data), step_pass)
-
-    def validade_short_test(self, step_pass: bool):
-        current_step_data = []
-
-        for channel in self.test_setup.channels:
-            channel_data = {
-                "channel_id": str(channel.channel_id),
-                "voltage_ref": self.short_test_params.voltage_lower,
-                "shutdown": self.shutdown_state,
-                "recovery": self.recovery_state,
-                "load": self.short_test_params.static_load,
-            }
-
-            current_step_data.append(channel_data)
-
-        self.steps_table.set_step_status(step_pass)
-        self.test_setup.test_sequence_status.append(step_pass)
-        self.handle_test_data(tuple(current_step_data), step_pass)
-        self.test_setup.current_index += 1
-        self.run_steps()
-
-    def handle_test_data(self, data: tuple, step_status: bool) -> None:
-        current_step = self.test_setup.active_test.steps[self.test_setup.current_index]
-        step_data = {
-            "description": current_step.description,
-            "status": step_status,
-            "type": current_step.step_type,
-            "channels": data,
-        }
-        self.test_setup.test_result_data["steps"].append(step_data)
-
     def handle_single_run(self):
         if self.steps_table.currentRow() >= 0:
-            self.test_setup.is_single_step = True
-            self.test_setup.selected_step_index = self.steps_table.currentRow()
-            self.start_test_sequence()
+            self.start_test_sequence(self.steps_table.currentRow())
 
     def reset_setup(self):
-        self.sat_controller.toggle_active_channels_input(
-            self.test_setup.get_active_channel_ids(), False
-        )
-        self.arduino_controller.set_active_pin(True)
-        self.monitoring_worker.pause()
-        self.delay_manager.paused = False
-        self.delay_manager.remaining_time = 0
         self.open_file_action.setDisabled(False)
         self.serial_number_value_field.setReadOnly(False)
         self.operator_name_value_field.setReadOnly(False)
-        self.test_setup.test_sequence_status.clear()
         self.test_setup.serial_number_changed = False
-        self.test_setup.is_single_step = False
-        self.test_setup.selected_step_index = -1
-        self.arduino_controller.active_input_source = 0
-        self.test_setup.current_index = 0
         self.steps_table.clearSelection()
 
-        while not self.arduino_controller.buzzer():
-            sleep(0.1)
-
-    @Slot()
-    def start_monitoring(self):
-        if self.monitoring_worker is None:
-            self.monitoring_worker = MonitorWorker(self.worker_signals)
-            self.thread_pool.start(self.monitoring_worker)
-        else:
-            self.monitoring_worker.resume()
-
     @Slot(int)
     def update_timer(self, remaining_time):
         self.steps_table.update_duration(remaining_time / 1000)
 
     @Slot()
     def update_output_display(self):
+        readings = self.instrument_worker.take_readings()
         for channel in self.test_setup.channels:
-            channel.update_voltage_value(
-                self.sat_controller.get_channel_value(channel.channel_id)
-            )
+            if channel.channel_id in readings:
+                channel.update_readings(readings[channel.channel_id])
+        self.engine.process_readings(readings)
 
-    def update_current_load(self, channel_id, load):
+    @Slot(str)
+    def on_instrument_error(self, message: str):
+        if not self.engine.active:
+            return
+        self.engine.instrument_failed()
+        show_custom_dialog(
+            self,
+            f"Falha de comunicação\n{message}",
+            QMessageBox.Icon.Critical,
+        )
+
+    def update_load_value(self, channel_id: int, load: float):
         for channel in self.test_setup.channels:
             if channel.channel_id == channel_id:
                 channel.update_load_value(load)
-                self.sat_controller.set_channel_current(channel_id, load)
 
     def serial_number_changed(self):
         self.test_setup.serial_number = str(
@@ -672,6 +473,7 @@ class MainWindow(QMainWindow):
             channel_monitor = ChannelMonitor(channel.id, channel.label)
             self.test_setup.channels.append(channel_monitor)
             self.v_channels_display_layout.addWidget(channel_monitor)
+        self.engine.load_test(self.test_setup.active_test)
 
     def open_test_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -706,9 +508,9 @@ class MainWindow(QMainWindow):
             item.widget().deleteLater()
 
     def update_status_label(self, step_description: str = ""):
-        status_text = f"{step_description}\n{self.state.value}"
+        status_text = f"{step_description}\n{self.engine.state.value}"
         self.test_status_label.setText(status_text.lstrip())
-        match self.state:
+        match self.engine.state:
             case TestState.PASSED | TestState.RUNNING:
                 color = "green"
             case TestState.FAILED | TestState.CANCELED:
@@ -721,23 +523,23 @@ class MainWindow(QMainWindow):
                 color = "black"
         self.test_status_label.setStyleSheet(f"color:{color};")
 
-    def read_temp_file(self) -> str:
-        if self.temp_file:
-            with open(self.temp_file_name, "r", encoding="utf-8") as file:
-                return file.read()
-
     def keyPressEvent(self, event: QKeyEvent):
-        if self.state is TestState.WAITKEY and event.key() in [
+        if self.engine.state is TestState.WAITKEY and event.key() in [
             Qt.Key.Key_Return,
             Qt.Key.Key_Enter,
         ]:
-            self.state = TestState.RUNNING
-            self.update_status_label()
-            self.on_delay_completed()
+            self.engine.continue_step()
 
     def closeEvent(self, event):
-        if self.monitoring_worker is not None:
-            self.monitoring_worker.stop()
+        self.monitoring_worker.stop()
+        self.instrument_worker.stop()
+        for worker_thread in self.worker_threads:
+            worker_thread.wait()
+        self.arduino_controller.close()
+        try:
+            self.results_database.close()
+        except ResultsDatabaseError as e:
+            show_custom_dialog(self, str(e), QMessageBox.Icon.Critical)
 
         event.accept()
 
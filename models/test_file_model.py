@@ -15,21 +15,27 @@ class LoadParameter:
     load_lower: Optional[float] = None
     increase_step: Optional[float] = None
     increase_delay: Optional[float] = None
+    # "linear" ramps by increase_step until the trip, "bisection" ramps by a
+    # multiple of search_resolution (increase_step by default) then bisects.
+    search_mode: str = "linear"
+    search_resolution: Optional[float] = None
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'LoadParameter':
+    def from_dict(cls, data: Dict[str, Any]) -> "LoadParameter":
         return cls(
-            id=data['id'],
-            tag=data['tag'],
-            voltage_under_limit=data.get('voltage_under_limit'),
-            voltage_upper=data.get('voltage_upper'),
-            voltage_lower=data.get('voltage_lower'),
-            static_load=data.get('static_load'),
-            end_load=data.get('end_load'),
-            load_upper=data.get('load_upper'),
-            load_lower=data.get('load_lower'),
-            increase_step=data.get('increase_step'),
-            increase_delay=data.get('increase_delay')
+            id=data["id"],
+            tag=data["tag"],
+            voltage_under_limit=data.get("voltage_under_limit"),
+            voltage_upper=data.get("voltage_upper"),
+            voltage_lower=data.get("voltage_lower"),
+            static_load=data.get("static_load"),
+            end_load=data.get("end_load"),
+            load_upper=data.get("load_upper"),
+            load_lower=data.get("load_lower"),
+            increase_step=data.get("increase_step"),
+            increase_delay=data.get("increase_delay"),
+            search_mode=data.get("search_mode", "linear"),
+            search_resolution=data.get("search_resolution"),
         )
 
 
@@ -46,6 +52,10 @@ class Step:
     duration: float
     input_source: int
     channels_configuration: Dict[int, LoadParameter]
+    # CC steps end early once stable for settle_window seconds (0 disables).
+    settle_window: float = 0.0
+    settle_variance: float = 0.0
+
 
 @dataclass
 class ActiveChannel:
@@ -80,6 +90,8 @@ class TestData:
                     config["channel_id"]: parameters_mapping[config["parameters_id"]]
                     for config in item["channels_configuration"]
                 },
+                settle_window=item.get("settle_window", 0.0),
+                settle_variance=item.get("settle_variance", 0.0),
             )
             for item in self.steps
         ]
@@ -0,0 +1,79 @@
+from collections import deque
+from time import sleep
+
+SIM_FIRMWARE_VERSION = "SIM"
+# Default time of one frame round trip.
+DEFAULT_LATENCY = 0.002
+
+
+class SimulatedArduinoSerial:
+    """
+    Serial peer running the firmware protocol (see README), used in place of the
+    serial.Serial connection of utils.arduino_interface.Arduino.
+    Each write() is one frame, its reply is queued for readline().
+    Pins holds the level of every pin, inputs read back what was written.
+    """
+
+    def __init__(self, latency: float = DEFAULT_LATENCY):
+        self.latency = latency
+        self.timeout = None
+        self.pins = [0] * 16
+        self.pin_modes = {}
+        self.replies = deque()
+        self.frames = 0
+        self.link_time = 0.0
+
+    def write(self, data: bytes) -> int:
+        self.frames += 1
+        self.link_time += self.latency
+        sleep(self.latency)
+        reply = self.execute(data.decode())
+        if reply is not None:
+            self.replies.append(f"{reply}\r\n".encode())
+        return len(data)
+
+    def readline(self) -> bytes:
+        return self.replies.popleft() if self.replies else b""
+
+    def reset_input_buffer(self) -> None:
+        self.replies.clear()
+
+    def close(self) -> None:
+        pass
+
+    def execute(self, frame: str) -> str | None:
+        if frame == "V":
+            return f"V:{SIM_FIRMWARE_VERSION}"
+        if frame.startswith("MP"):
+            for pin in mask_pins(frame[3:]):
+                self.pin_modes[pin] = frame[2]
+            return "OK"
+        if frame.startswith("M"):
+            self.pin_modes[int(frame[2:])] = frame[1]
+            return "OK"
+        if frame.startswith("WD"):
+            pin, value = frame[2:].split(":")
+            self.pins[int(pin)] = int(value)
+            return "OK"
+        if frame.startswith("WP"):
+            mask, values = frame[2:].split(":")
+            set_pins = mask_pins(values)
+            for pin in mask_pins(mask):
+                self.pins[pin] = int(pin in set_pins)
+            return "OK"
+        if frame.startswith("RD"):
+            pin = int(frame[2:])
+            return f"D{pin}:{self.pins[pin]}"
+        if frame.startswith("RP"):
+            mask = frame[2:]
+            bits = sum(self.pins[pin] << pin for pin in mask_pins(mask))
+            return f"P{mask}:{bits:04X}"
+        return f"ERR:{frame}"
+
+
+def mask_pins(mask: str) -> list[int]:
+    """
+    Returns the pins of a 4 hex digit mask, the inverse of pin_mask().
+    """
+    bits = int(mask, 16)
+    return [pin for pin in range(16) if bits >> pin & 1]
@@ -0,0 +1,59 @@
+import os
+
+import yaml
+
+from simulators.arduino import SimulatedArduinoSerial
+from simulators.it8700 import SimulatedIT8700, SimulatedSupply
+
+# Set to "sim" to run on the simulated instruments instead of the hardware.
+BACKEND_ENV = "IT8700_BACKEND"
+# Optional YAML file with the simulator settings, e.g.
+# latency: 0.002
+# arduino_latency: 0.002
+# supplies:
+#   1: {nominal_voltage: 12.0, current_limit: 5.0}
+SIM_CONFIG_ENV = "IT8700_SIM_CONFIG"
+
+
+def simulation_enabled() -> bool:
+    return os.environ.get(BACKEND_ENV, "").lower() == "sim"
+
+
+def load_simulator_config() -> dict:
+    config_path = os.environ.get(SIM_CONFIG_ENV)
+    if not config_path:
+        return {}
+    with open(config_path, "r") as config_file:
+        return yaml.safe_load(config_file.read()) or {}
+
+
+def create_load_simulator() -> SimulatedIT8700 | None:
+    """
+    Returns a SimulatedIT8700 built from the simulator config, None when the
+    hardware backend is selected.
+    """
+    if not simulation_enabled():
+        return None
+    config = load_simulator_config()
+    supplies = {
+        int(channel_id): SimulatedSupply(**settings)
+        for channel_id, settings in config.get("supplies", {}).items()
+    }
+    return SimulatedIT8700(supplies, **pick(config, "latency"))
+
+
+def create_arduino_simulator() -> SimulatedArduinoSerial | None:
+    """
+    Returns a SimulatedArduinoSerial built from the simulator config, None when
+    the hardware backend is selected.
+    """
+    if not simulation_enabled():
+        return None
+    config = load_simulator_config()
+    return SimulatedArduinoSerial(
+        **{"latency": config["arduino_latency"]} if "arduino_latency" in config else {}
+    )
+
+
+def pick(config: dict, *keys: str) -> dict:
+    return {key: config[key] for key in keys if key in config}
@@ -0,0 +1,162 @@
+import random
+from dataclasses import dataclass
+from time import monotonic, sleep
+
+from pyvisa import constants
+from pyvisa.errors import VisaIOError
+
+from utils.scpi_commands import *
+
+SIM_INST_ID = "ITECH Ltd.,IT8700-SIM,000000000000,1.0"
+# Default time of one transaction, on top of the bytes transmission time.
+DEFAULT_LATENCY = 0.002
+
+
+@dataclass
+class SimulatedSupply:
+    """
+    Power supply output wired to one load channel.
+    The output sags by resistance * current up to current_limit and collapses
+    above it. A short shuts the output down shutdown_delay seconds after it is
+    applied, it comes back recovery_delay seconds after the short is removed.
+    """
+
+    nominal_voltage: float = 12.0
+    resistance: float = 0.02
+    current_limit: float = 5.0
+    shutdown_delay: float = 0.005
+    recovery_delay: float = 0.05
+    noise: float = 0.005
+
+
+class SimulatedChannel:
+    def __init__(self, supply: SimulatedSupply):
+        self.supply = supply
+        self.current = 0.0
+        self.input_on = False
+        self.short_on = False
+        self.function = "CURR"
+        self.short_changed = -float("inf")
+
+    def set_short(self, state: bool) -> None:
+        if state != self.short_on:
+            self.short_on = state
+            self.short_changed = monotonic()
+
+    def measure(self) -> tuple[float, float]:
+        """
+        Returns the (voltage, current) seen by the channel now.
+        """
+        supply = self.supply
+        elapsed = monotonic() - self.short_changed
+        if self.short_on and elapsed >= supply.shutdown_delay:
+            return 0.0, 0.0
+        if not self.short_on and elapsed < supply.recovery_delay:
+            return 0.0, 0.0
+        current = self.current if self.input_on else 0.0
+        if current > supply.current_limit:
+            return 0.0, 0.0
+        voltage = supply.nominal_voltage - supply.resistance * current
+        return voltage + random.gauss(0.0, supply.noise), current
+
+
+class SimulatedIT8700:
+    """
+    SCPI model of an IT8700 frame, used in place of the pyvisa resource.
+    Accepts compound messages ("CMD;:CMD?") like the instrument, answers the
+    queries of one message joined by ";". Every transaction blocks for latency
+    plus the transmission time of the message at baud_rate, transactions and
+    link_time account for them. Writes are executed once transmitted, queries
+    halfway, as the response travels back for the other half.
+    """
+
+    def __init__(
+        self,
+        supplies: dict[int, SimulatedSupply] | None = None,
+        latency: float = DEFAULT_LATENCY,
+    ):
+        self.supplies = supplies or {}
+        self.latency = latency
+        self.baud_rate = 115200
+        self.transactions = 0
+        self.link_time = 0.0
+        self.channels: dict[int, SimulatedChannel] = {}
+        self.active_channel = 1
+
+    def get_channel(self, channel_id: int) -> SimulatedChannel:
+        if channel_id not in self.channels:
+            supply = self.supplies.get(channel_id, SimulatedSupply())
+            self.channels[channel_id] = SimulatedChannel(supply)
+        return self.channels[channel_id]
+
+    def transmit(self, message: str) -> float:
+        """
+        Accounts for the transaction of message and returns its duration.
+        """
+        # 10 bits per byte on the serial line.
+        duration = self.latency + 10 * (len(message) + 1) / self.baud_rate
+        self.transactions += 1
+        self.link_time += duration
+        return duration
+
+    def write(self, message: str) -> None:
+        sleep(self.transmit(message))
+        self.execute(message)
+
+    def query(self, message: str) -> str:
+        duration = self.transmit(message)
+        sleep(duration / 2)
+        responses = self.execute(message)
+        sleep(duration / 2)
+        if not responses:
+            raise VisaIOError(constants.VI_ERROR_TMO)
+        return ";".join(responses) + "\n"
+
+    def close(self) -> None:
+        pass
+
+    def execute(self, message: str) -> list[str]:
+        responses = []
+        for command in message.strip().split(";"):
+            response = self.execute_command(command.strip().lstrip(":"))
+            if response is not None:
+                responses.append(response)
+        return responses
+
+    def execute_command(self, command: str) -> str | None:
+        channel = self.get_channel(self.active_channel)
+        match command.split(" ", 1):
+            case [header, value] if f"{header} " == SELECT_CHANNEL:
+                self.active_channel = int(value)
+            case [header, value] if f"{header} " == SET_CURR:
+                channel.current = float(value)
+            case [header, value] if f"{header} " == SET_FUNC:
+                channel.function = value.strip().upper()
+            case ["INP", value]:
+                channel.input_on = value == "1"
+            case ["INP:SHOR", value]:
+                channel.set_short(value == "1")
+            case [query] if query == INST_ID:
+                return SIM_INST_ID
+            case [query] if query == OPERATION_COMPLETE:
+                return "1"
+            case [query] if query == GET_CURR:
+                return f"{channel.current:.4f}"
+            case [query] if query == GET_INPUT:
+                return str(int(channel.input_on))
+            case [query] if query == GET_SHORT:
+                return str(int(channel.short_on))
+            case [query] if query == GET_FUNC:
+                return channel.function
+            case [query] if query == FETCH_VOLT:
+                return f"{channel.measure()[0]:.4f}"
+            case [query] if query == FETCH_CURR:
+                return f"{channel.measure()[1]:.4f}"
+            case [query] if query == FETCH_POW:
+                voltage, current = channel.measure()
+                return f"{voltage * current:.4f}"
+            case [header] if header == RESET:
+                self.channels.clear()
+                self.active_channel = 1
+        # SYST:REM, *CLS and unknown commands are accepted silently.
+        return None
@@ -0,0 +1,61 @@
+import pytest
+
+from controllers.arduino_controller import ArduinoController
+from simulators.arduino import SimulatedArduinoSerial
+
+
+class FailingSerial(SimulatedArduinoSerial):
+    """
+    Simulated board rejecting the port writes while failing is set.
+    """
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.failing = False
+
+    def execute(self, frame: str) -> str | None:
+        if self.failing and frame.startswith("WP"):
+            return f"ERR:{frame}"
+        return super().execute(frame)
+
+
+def test_input_source_follows_the_write():
+    serial = SimulatedArduinoSerial(latency=0.05)
+    controller = ArduinoController(serial)
+    future = controller.set_input_source(2, "CA")
+
+    assert controller.active_input_source == 0
+    future.result()
+    assert controller.active_input_source == 2
+    assert serial.pins[5] == 1
+    assert controller.set_input_source(2, "CA").done()
+    controller.close()
+
+
+def test_failed_write_leaves_the_input_source_unknown():
+    serial = FailingSerial()
+    controller = ArduinoController(serial)
+    serial.failing = True
+
+    with pytest.raises(IOError):
+        controller.set_input_source(1, "CA").result()
+    assert controller.active_input_source == 0
+
+    serial.failing = False
+    controller.set_input_source(1, "CA").result()
+    assert controller.active_input_source == 1
+    assert serial.pins[4] == 1
+    controller.close()
+
+
+def test_reset_clears_the_input_source():
+    serial = SimulatedArduinoSerial(latency=0.0)
+    controller = ArduinoController(serial)
+    controller.set_input_source(3, "CC").result()
+    controller.set_active_pin(True).result()
+
+    assert controller.active_input_source == 0
+    assert serial.pins[9] == 0
+    controller.set_input_source(3, "CC").result()
+    assert serial.pins[9] == 1
+    controller.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from simulators.arduino import SimulatedArduinoSerial
+from utils.arduino_interface import Arduino
+
+
+class ScriptedSerial(SimulatedArduinoSerial):
+    """
+    Simulated board answering the next frame with reply instead.
+    """
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.reply = None
+
+    def execute(self, frame: str) -> str | None:
+        if self.reply is not None and frame != "V":
+            return self.reply
+        return super().execute(frame)
+
+
+def connect() -> tuple[Arduino, ScriptedSerial]:
+    serial = ScriptedSerial()
+    return Arduino(conn=serial), serial
+
+
+def test_port_read_returns_every_pin():
+    arduino, _ = connect()
+    arduino.port_write({4: 1, 7: 0, 9: 1})
+
+    assert arduino.port_read([4, 7, 9]) == {4: 1, 7: 0, 9: 1}
+
+
+@pytest.mark.parametrize("reply", ["P0001:0001", "P0090", "P0090:XYZ", "ERR:RP0090"])
+def test_port_read_rejects_an_unexpected_reply(reply):
+    arduino, serial = connect()
+    serial.reply = reply
+
+    with pytest.raises(IOError):
+        arduino.port_read([4, 7])
+
+
+def test_port_read_times_out_without_a_reply():
+    arduino, serial = connect()
+    serial.reply = ""
+
+    with pytest.raises(TimeoutError):
+        arduino.port_read([4, 7])
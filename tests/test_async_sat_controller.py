@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+import time
+import tty
+
+import pytest
+
+from controllers.async_sat_controller import AsyncElectronicLoadController
+from utils.scpi_commands import FETCH_VOLT, INST_ID
+
+INST_ID_REPLY = "ITECH Ltd.,IT8700-PTY,0,1.0"
+
+
+class PtyInstrument:
+    """
+    Answers on the master side of a pty, one message after the other like the
+    instrument: INST_ID with INST_ID_REPLY and FETCH_VOLT with the selected
+    channel number, after delays[channel] seconds.
+    """
+
+    def __init__(self, delays: dict[int, float]):
+        self.delays = delays
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self.slave = slave
+        self.channel = 1
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        buffer = b""
+        while self.running:
+            try:
+                buffer += os.read(self.master, 256)
+            except OSError:
+                return
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                self.answer(line.decode())
+
+    def answer(self, message: str):
+        replies = []
+        delay = 0.0
+        for command in message.split(";"):
+            command = command.lstrip(":")
+            if command.startswith("CHAN "):
+                self.channel = int(command[5:])
+            elif command == INST_ID:
+                replies.append(INST_ID_REPLY)
+            elif command == FETCH_VOLT:
+                delay = self.delays.get(self.channel, 0.0)
+                replies.append(f"{self.channel}.0")
+        if replies:
+            time.sleep(delay)
+            os.write(self.master, (";".join(replies) + "\n").encode())
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+@pytest.fixture
+def instrument():
+    instrument = PtyInstrument({1: 0.15})
+    yield instrument
+    instrument.close()
+
+
+def test_late_reply_of_timed_out_query_is_dropped(instrument):
+    async def scenario():
+        controller = AsyncElectronicLoadController(instrument.port, timeout=0.1)
+        await controller.connect()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await controller.get_channel_value(1)
+            # Channel 1 answers while channel 2 waits for its reply.
+            channel_2 = await controller.get_channel_value(2)
+            await asyncio.sleep(0.2)
+            channel_3 = await controller.get_channel_value(3)
+        finally:
+            await controller.close()
+        return channel_2, channel_3
+
+    assert asyncio.run(scenario()) == ("2.0", "3.0")
+
+
+def test_late_reply_of_cancelled_query_is_dropped(instrument):
+    async def scenario():
+        controller = AsyncElectronicLoadController(instrument.port, timeout=1.0)
+        await controller.connect()
+        try:
+            query = asyncio.create_task(controller.get_channel_value(1))
+            await asyncio.sleep(0.05)
+            query.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await query
+            return await controller.get_channel_value(2)
+        finally:
+            await controller.close()
+
+    assert asyncio.run(scenario()) == "2.0"
@@ -0,0 +1,118 @@
+import pytest
+
+from models.test_file_model import LoadParameter
+from utils.channel_tests import SHORT_TIMEOUT, CurrentLimitRamp, ShortCircuitTest
+
+
+def cl_params(**values) -> LoadParameter:
+    return LoadParameter(
+        id=1,
+        tag="12V",
+        voltage_under_limit=10.0,
+        voltage_lower=11.5,
+        voltage_upper=12.5,
+        static_load=2.0,
+        end_load=9.0,
+        load_lower=4.5,
+        load_upper=5.5,
+        increase_step=0.5,
+        increase_delay=0.2,
+        **values,
+    )
+
+
+def run_ramp(params: LoadParameter, trip_current: float) -> CurrentLimitRamp:
+    """
+    Runs the ramp against a supply whose output collapses above trip_current.
+    """
+    loads = {}
+    ramp = CurrentLimitRamp(1, params, loads.__setitem__, 0.0)
+    now = 0.0
+    while not ramp.done:
+        load = loads[1]
+        tripped = load > trip_current
+        ramp.update(0.0 if tripped else 12.0, 0.0 if tripped else load, now)
+        now += params.increase_delay / 4
+        assert now < 60, "ramp did not finish"
+    return ramp
+
+
+@pytest.mark.parametrize("trip_current", [4.6, 5.03, 5.5, 8.2])
+def test_bisection_finds_trip_in_fewer_set_points(trip_current):
+    linear = run_ramp(cl_params(), trip_current)
+    bisection = run_ramp(cl_params(search_mode="bisection"), trip_current)
+
+    # Same precision: the first failing load within one increase_step.
+    for ramp in (linear, bisection):
+        assert trip_current < ramp.trip_load <= trip_current + 0.5
+    assert bisection.set_points < linear.set_points
+
+
+def test_bisection_resolution():
+    ramp = run_ramp(
+        cl_params(search_mode="bisection", search_resolution=0.05), trip_current=5.03
+    )
+    assert 5.03 < ramp.trip_load <= 5.03 + 0.05
+    # A linear ramp would need (5.03 - 2.0) / 0.05 set points at this resolution.
+    assert ramp.set_points <= 12
+
+
+def test_linear_ramp_without_trip():
+    ramp = run_ramp(cl_params(), trip_current=20.0)
+    assert ramp.trip_load is None
+    assert ramp.peak_current > ramp.params.end_load
+
+
+class ShortSwitch:
+    """
+    Stands in for the engine toggle_short_mode(), the switch callbacks are
+    called by the test with the time the switch reached the instrument.
+    """
+
+    def __init__(self):
+        self.switches = []
+
+    def __call__(self, channel_id, state, on_switched):
+        self.switches.append((state, on_switched))
+
+
+def test_short_times_are_measured_from_the_switches():
+    switch = ShortSwitch()
+    test = ShortCircuitTest(1, cl_params(), switch, lambda *args: None, 0.0)
+    test.update(12.0, 2.0, 0.01)
+    state, on_applied = switch.switches[0]
+    assert state
+    on_applied(0.02)
+    test.update(12.0, 2.0, 0.01)  # Fetched before the short.
+    test.update(0.0, 0.0, 0.03)
+    assert test.shutdown_time == pytest.approx(0.01)
+
+    # Still shorted until the removal reaches the instrument.
+    state, on_removed = switch.switches[1]
+    assert not state
+    test.update(12.0, 2.0, 0.04)
+    on_removed(0.05)
+    test.update(0.0, 0.0, 0.06)
+    test.update(12.0, 2.0, 0.1)
+    assert test.recovery_time == pytest.approx(0.05)
+    assert test.done and test.passed()
+
+
+def test_short_waits_for_the_output_to_come_up():
+    switch = ShortSwitch()
+    test = ShortCircuitTest(1, cl_params(), switch, lambda *args: None, 0.0)
+    test.update(0.0, 0.0, 0.01)
+    test.update(5.0, 1.0, 0.1)
+    assert not switch.switches
+    test.update(11.9, 2.0, 0.2)
+    assert switch.switches[0][0] is True
+    assert not test.done
+
+
+def test_short_fails_when_output_never_comes_up():
+    switch = ShortSwitch()
+    test = ShortCircuitTest(1, cl_params(), switch, lambda *args: None, 0.0)
+    test.update(5.0, 1.0, SHORT_TIMEOUT + 0.1)
+    assert test.done and not test.passed()
+    # The short was never applied, nothing to remove.
+    assert not switch.switches
@@ -0,0 +1,54 @@
+from threading import Thread
+from time import monotonic, sleep
+
+from utils.monitor_worker import MonitorWorker
+
+
+class RecordingInstrument:
+    """
+    Stands in for the InstrumentWorker, records the time each channel is read.
+    """
+
+    def __init__(self, channel_ids):
+        self.channel_ids = tuple(channel_ids)
+        self.readings = {channel_id: [] for channel_id in channel_ids}
+
+    def request_readings(self, channel_ids):
+        now = monotonic()
+        for channel_id in channel_ids:
+            self.readings[channel_id].append(now)
+
+
+def run_monitor(monitor: MonitorWorker, duration: float) -> None:
+    thread = Thread(target=monitor.run)
+    thread.start()
+    sleep(duration)
+    monitor.stop()
+    thread.join()
+
+
+def test_slow_channel_does_not_slow_default_channels():
+    instrument = RecordingInstrument([1, 2])
+    monitor = MonitorWorker(instrument, sample_period=0.05)
+    monitor.set_sample_period(1, 0.2)
+    run_monitor(monitor, 1.0)
+
+    # About 20 readings at 0.05 s, 5 at 0.2 s.
+    assert len(instrument.readings[2]) >= 15
+    assert len(instrument.readings[1]) <= 7
+
+
+def test_cleared_period_is_applied_right_away():
+    instrument = RecordingInstrument([1])
+    monitor = MonitorWorker(instrument, sample_period=0.05)
+    monitor.set_sample_period(1, 10.0)
+    thread = Thread(target=monitor.run)
+    thread.start()
+    sleep(0.2)
+    monitor.clear_sample_period(1)
+    sleep(0.5)
+    monitor.stop()
+    thread.join()
+
+    # One reading at the start, then the default rate once cleared.
+    assert len(instrument.readings[1]) >= 8
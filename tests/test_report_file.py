@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from utils import report_file
+
+RESULT_DATA = {
+    "group": "TEST",
+    "model": "Report test",
+    "customer": "",
+    "serial_number": "00000001",
+    "operator": "",
+    "steps": [
+        {
+            "index": 0,
+            "description": "Carga nominal",
+            "status": True,
+            "type": 1,
+            "channels": [
+                {"channel_id": 1, "load": 2.0, "voltage_mean": 12.01},
+                {"channel_id": 2, "load": 1.0, "voltage_mean": 5.02},
+            ],
+        }
+    ],
+}
+
+
+@pytest.fixture
+def writers(monkeypatch):
+    monkeypatch.setattr(report_file, "REPORT_WRITERS", dict(report_file.REPORT_WRITERS))
+    monkeypatch.setattr(
+        report_file, "REPORT_EXTENSIONS", dict(report_file.REPORT_EXTENSIONS)
+    )
+
+
+def test_registered_writer_renders_its_format(writers):
+    @report_file.report_writer("serials")
+    def write_serials(result: report_file.TestResult) -> str:
+        return f"{result.serial_number} {'PASS' if result.passed else 'FAIL'}\n"
+
+    reports = report_file.generate_reports(RESULT_DATA, ("serials", "jsonl"))
+
+    assert reports["serials"] == "00000001 PASS\n"
+    records = [json.loads(line) for line in reports["jsonl"].splitlines()]
+    assert [record["channel_id"] for record in records] == [1, 2]
+    assert records[0]["voltage_mean"] == 12.01
+
+
+def test_save_report_files_writes_every_format(tmp_path):
+    reports = report_file.generate_reports(RESULT_DATA, ("text", "csv"))
+    report_file.save_report_files(reports, str(tmp_path / "00000001"))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "00000001.csv",
+        "00000001.txt",
+    ]
+    assert (tmp_path / "00000001.txt").read_text(encoding="utf-8") == reports["text"]
+
+
+def test_failed_save_keeps_the_previous_report(tmp_path, monkeypatch):
+    file_path = tmp_path / "00000001.txt"
+    report_file.save_report_file("previous\n", str(file_path))
+
+    def fail_replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(report_file.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        report_file.save_report_file("new\n", str(file_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["00000001.txt"]
+    assert file_path.read_text(encoding="utf-8") == "previous\n"
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from utils import enums
+from utils.results_database import ResultsDatabase, ResultsDatabaseError
+
+
+def make_run(serial_number: str, status=0) -> dict:
+    return {
+        "serial_number": serial_number,
+        "steps": [
+            {
+                "index": 0,
+                "description": "CC",
+                "type": 1,
+                "status": status,
+                "channels": [{"channel_id": 1, "voltage": 12.0}],
+            }
+        ],
+    }
+
+
+def serial_numbers(path: str) -> list[str]:
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT serial_number FROM runs").fetchall()
+    return [row[0] for row in rows]
+
+
+def test_failed_write_is_raised_and_the_writer_keeps_running(tmp_path):
+    database = ResultsDatabase(str(tmp_path / "results.db"))
+    # A status that sqlite3 can't bind.
+    database.record(
+        make_run("00000001", status=object()), enums.TestState.FAILED, False
+    )
+    database.wait()
+
+    with pytest.raises(ResultsDatabaseError):
+        database.record(make_run("00000002"), enums.TestState.PASSED, False)
+    database.record(make_run("00000003"), enums.TestState.PASSED, False)
+    database.close()
+
+    assert serial_numbers(database.path) == ["00000002", "00000003"]
+
+
+def test_close_raises_a_failed_write(tmp_path):
+    database = ResultsDatabase(str(tmp_path / "results.db"))
+    database.record(
+        make_run("00000001", status=object()), enums.TestState.FAILED, False
+    )
+
+    with pytest.raises(ResultsDatabaseError):
+        database.close()
+    assert serial_numbers(database.path) == []
+
+
+def test_unreachable_database_is_raised(tmp_path):
+    database = ResultsDatabase(str(tmp_path / "missing" / "results.db"))
+    database.record(make_run("00000001"), enums.TestState.PASSED, False)
+
+    with pytest.raises(ResultsDatabaseError):
+        database.close()
@@ -0,0 +1,138 @@
+import pytest
+from pyvisa import constants
+from pyvisa.errors import VisaIOError
+
+from controllers.sat_controller import ElectronicLoadController
+from simulators.it8700 import SimulatedIT8700, SimulatedSupply
+
+
+class RecordingIT8700(SimulatedIT8700):
+    """
+    Simulated IT8700 without latency, keeps every message it received.
+    """
+
+    def __init__(self, supplies: dict[int, SimulatedSupply] | None = None):
+        super().__init__(supplies, latency=0.0)
+        self.messages = []
+
+    def write(self, message: str) -> None:
+        self.messages.append(message)
+        super().write(message)
+
+    def query(self, message: str) -> str:
+        self.messages.append(message)
+        return super().query(message)
+
+    def commands(self) -> list[str]:
+        return [
+            command.lstrip(":")
+            for message in self.messages
+            for command in message.split(";")
+        ]
+
+
+class CompoundFailingIT8700(RecordingIT8700):
+    """
+    Fails the compound fetches (more than one query in a message) with a
+    timeout, or answers them without the last value.
+    """
+
+    def __init__(self, supplies: dict[int, SimulatedSupply], failure: str):
+        super().__init__(supplies)
+        self.failure = failure
+
+    def query(self, message: str) -> str:
+        if message.count("?") < 2:
+            return super().query(message)
+        if self.failure == "timeout":
+            self.messages.append(message)
+            raise VisaIOError(constants.VI_ERROR_TMO)
+        return super().query(message).strip().rsplit(";", 1)[0] + "\n"
+
+
+def connect(
+    simulator: RecordingIT8700 | None = None,
+) -> tuple[ElectronicLoadController, RecordingIT8700]:
+    simulator = simulator or RecordingIT8700()
+    controller = ElectronicLoadController(simulator)
+    simulator.messages.clear()
+    return controller, simulator
+
+
+def test_repeated_writes_are_dropped():
+    controller, simulator = connect()
+    controller.set_channel_current(1, 2.0)
+    controller.toggle_active_channels_input([1], True)
+    controller.flush()
+    controller.set_channel_current(1, 2.0)
+    controller.toggle_active_channels_input([1], True)
+    controller.flush()
+
+    commands = simulator.commands()
+    assert commands.count("CURR 2.0") == 1
+    assert commands.count("INP 1") == 1
+
+
+def test_verify_state_mismatch_forces_a_rewrite():
+    controller, simulator = connect()
+    controller.set_channel_current(1, 2.0)
+    controller.toggle_active_channels_input([1, 2], True)
+    controller.flush()
+    # Changed from the instrument panel.
+    simulator.get_channel(1).current = 3.0
+
+    assert controller.verify_state([1, 2]) == [1]
+    simulator.messages.clear()
+    controller.set_channel_current(1, 2.0)
+    controller.set_channel_current(2, 0.0)
+    controller.flush()
+    assert "CURR 2.0" in simulator.commands()
+    # Channel 2 matched, its current is already 0.
+    assert simulator.get_channel(2).current == 0.0
+    assert simulator.commands().count("CURR 0.0") == 0
+
+
+def test_reconnect_verifies_the_cached_channels():
+    controller, simulator = connect()
+    controller.toggle_active_channels_input([1], True)
+    controller.flush()
+    simulator.get_channel(1).input_on = False
+
+    assert controller.reconnect() == [1]
+    controller.toggle_active_channels_input([1], True)
+    controller.flush()
+    assert simulator.get_channel(1).input_on
+
+
+@pytest.mark.parametrize("failure", ["timeout", "short"])
+def test_compound_fetch_failure_falls_back_to_per_query(failure):
+    supplies = {
+        1: SimulatedSupply(nominal_voltage=12.0, noise=0.0),
+        2: SimulatedSupply(nominal_voltage=5.0, noise=0.0),
+    }
+    controller, simulator = connect(CompoundFailingIT8700(supplies, failure))
+    controller.set_channel_current(2, 0.0)
+    controller.set_channel_current(1, 1.0)
+    controller.flush()
+    simulator.messages.clear()
+
+    readings = controller.get_channels_values([1, 2])
+
+    assert not controller.compound_supported
+    assert readings[1].voltage == pytest.approx(12.0)
+    assert readings[2].voltage == pytest.approx(5.0)
+    # The failed message may have changed channels, 1 is selected again.
+    assert simulator.messages[1:] == [
+        "*CLS",
+        "CHAN 1",
+        "FETC:VOLT?",
+        "FETC:CURR?",
+        "FETC:POW?",
+        "CHAN 2",
+        "FETC:VOLT?",
+        "FETC:CURR?",
+        "FETC:POW?",
+    ]
+    simulator.messages.clear()
+    controller.get_channels_values([1, 2])
+    assert all(message.count("?") <= 1 for message in simulator.messages)
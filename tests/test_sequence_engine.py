@@ -0,0 +1,207 @@
+import sqlite3
+from threading import Timer
+from time import monotonic
+
+import pytest
+
+from controllers.arduino_controller import ArduinoController
+from controllers.sat_controller import ElectronicLoadController
+from headless import HeadlessRunner
+from models import test_file_model
+from simulators.arduino import SimulatedArduinoSerial
+from simulators.it8700 import SimulatedIT8700, SimulatedSupply
+from utils import enums, sequence_engine
+from utils.results_database import ResultsDatabase
+
+LATENCY = 0.001
+
+
+def make_test(*steps: dict) -> test_file_model.TestData:
+    return test_file_model.TestData(
+        group="TEST",
+        model="Engine test",
+        customer="",
+        input_type="CA",
+        input_sources=[127, 220, 0],
+        active_channels=[{"id": 1, "label": "12V"}],
+        load_parameters=[
+            {
+                "id": 1,
+                "tag": "12V",
+                "voltage_under_limit": 10.0,
+                "voltage_lower": 11.5,
+                "voltage_upper": 12.5,
+                "static_load": 2.0,
+                "end_load": 7.0,
+                "load_lower": 4.5,
+                "load_upper": 5.5,
+                "increase_step": 0.5,
+                "increase_delay": 0.1,
+            }
+        ],
+        steps=[
+            {
+                "input_source": 1,
+                "channels_configuration": [{"channel_id": 1, "parameters_id": 1}],
+                **step,
+            }
+            for step in steps
+        ],
+    )
+
+
+CC_STEP = {"step_type": 1, "description": "Carga nominal", "duration": 1.0}
+CL_STEP = {"step_type": 2, "description": "Limite de corrente", "duration": 0.0}
+SHORT_STEP = {"step_type": 3, "description": "Curto-circuito", "duration": 0.0}
+
+
+class QuietRunner(HeadlessRunner):
+    def log(self, text: str):
+        pass
+
+
+def run_sequence(
+    test: test_file_model.TestData,
+    supply: SimulatedSupply,
+    cancel_after=None,
+    step_index=None,
+    results_database=None,
+):
+    """
+    Runs test (only step_index when given) on the simulators with supply wired
+    to channel 1, canceling the sequence cancel_after seconds after it starts
+    when given. Returns the runner and the run duration.
+    """
+    runner = QuietRunner(
+        test,
+        ElectronicLoadController(SimulatedIT8700({1: supply}, LATENCY)),
+        ArduinoController(SimulatedArduinoSerial(LATENCY)),
+        results_database,
+    )
+    if cancel_after is not None:
+        timer = Timer(cancel_after, runner.tasks.put, [(runner.engine.cancel,)])
+        timer.start()
+    start = monotonic()
+    runner.run("00000001", "", step_index)
+    return runner, monotonic() - start
+
+
+def channel_data(runner: HeadlessRunner, step_index: int = 0) -> dict:
+    return runner.result_data["steps"][step_index]["channels"][0]
+
+
+def test_cc_step_passes_inside_the_band():
+    runner, _ = run_sequence(make_test(CC_STEP), SimulatedSupply(resistance=0.0))
+
+    assert runner.engine.state is enums.TestState.PASSED
+    assert runner.result_data["steps"][0]["status"]
+
+
+def test_cc_step_fails_below_the_band():
+    supply = SimulatedSupply(nominal_voltage=11.0, resistance=0.0)
+    runner, _ = run_sequence(make_test(CC_STEP), supply)
+
+    assert runner.engine.state is enums.TestState.FAILED
+    assert not runner.result_data["steps"][0]["status"]
+
+
+SETTLE_STEP = {**CC_STEP, "duration": 5.0, "settle_window": 0.3, "settle_variance": 0.1}
+
+
+def test_cc_step_ends_early_once_settled():
+    runner, duration = run_sequence(
+        make_test(SETTLE_STEP), SimulatedSupply(resistance=0.0)
+    )
+
+    assert runner.engine.state is enums.TestState.PASSED
+    assert duration < 3.0
+
+
+def test_cc_step_settle_check_without_voltage_limits():
+    test = make_test({**SETTLE_STEP, "duration": 1.0})
+    test.load_parameters[0].voltage_lower = None
+    test.load_parameters[0].voltage_upper = None
+    runner, duration = run_sequence(test, SimulatedSupply(resistance=0.0))
+
+    # Missing limits read as 0 V, the output never settles inside them.
+    assert runner.engine.state is enums.TestState.FAILED
+    assert duration >= 1.0
+
+
+@pytest.mark.parametrize("current_limit, passed", [(5.2, True), (6.2, False)])
+def test_cl_step_finds_the_trip_point(current_limit, passed):
+    supply = SimulatedSupply(resistance=0.0, current_limit=current_limit)
+    runner, _ = run_sequence(make_test(CL_STEP), supply)
+
+    data = channel_data(runner)
+    # The first 0.5 A set point past the limit.
+    assert current_limit < data["trip_load"] <= current_limit + 0.5
+    assert runner.result_data["steps"][0]["status"] is passed
+
+
+def test_short_step_measures_shutdown_and_recovery():
+    supply = SimulatedSupply(shutdown_delay=0.005, recovery_delay=0.05)
+    runner, _ = run_sequence(make_test(SHORT_STEP), supply)
+
+    data = channel_data(runner)
+    assert runner.engine.state is enums.TestState.PASSED
+    assert 0.005 <= data["shutdown_time"] < 0.02
+    assert 0.05 <= data["recovery_time"] < 0.07
+
+
+def test_short_step_times_out_from_the_engine(monkeypatch):
+    # Only the engine timer is shortened, the output never reaches
+    # voltage_lower so the test itself would wait for the full timeout.
+    monkeypatch.setattr(sequence_engine, "SHORT_TIMEOUT", 0.5)
+    supply = SimulatedSupply(nominal_voltage=11.0, resistance=0.0)
+    runner, duration = run_sequence(make_test(SHORT_STEP), supply)
+
+    assert runner.engine.state is enums.TestState.FAILED
+    assert not channel_data(runner)["shutdown"]
+    assert duration < 5.0
+
+
+def test_cancel_mid_step_stops_the_sequence():
+    step = {**CC_STEP, "duration": 10.0}
+    runner, duration = run_sequence(
+        make_test(step, CC_STEP), SimulatedSupply(), cancel_after=0.5
+    )
+
+    assert runner.engine.state is enums.TestState.CANCELED
+    assert duration < 5.0
+    assert not runner.engine.test_result_data["steps"]
+
+
+def test_single_step_run_records_the_test_file_index(tmp_path):
+    database = ResultsDatabase(str(tmp_path / "results.db"))
+    short_step = {**CC_STEP, "duration": 0.5}
+    runner, _ = run_sequence(
+        make_test(short_step, short_step),
+        SimulatedSupply(resistance=0.0),
+        step_index=1,
+        results_database=database,
+    )
+    database.close()
+
+    assert runner.result_data["steps"][0]["index"] == 1
+    with sqlite3.connect(database.path) as connection:
+        rows = connection.execute("SELECT step_index FROM steps").fetchall()
+    assert rows == [(1,)]
+
+
+def test_run_after_an_instrument_error_reconnects():
+    simulator = SimulatedIT8700({1: SimulatedSupply(resistance=0.0)}, LATENCY)
+    controller = ElectronicLoadController(simulator)
+    runner = QuietRunner(
+        make_test(CC_STEP),
+        controller,
+        ArduinoController(SimulatedArduinoSerial(LATENCY)),
+    )
+    reconnects = []
+    reconnect = controller.reconnect
+    controller.reconnect = lambda: reconnects.append(reconnect())
+    runner.engine.instrument_failed()
+    runner.run("00000001", "")
+
+    assert len(reconnects) == 1
+    assert runner.engine.state is enums.TestState.PASSED
@@ -0,0 +1,52 @@
+from time import sleep
+
+import pytest
+
+from utils.step_timer import StepTimer
+
+
+def poll_until_done(timer: StepTimer) -> None:
+    while timer.active:
+        timer.poll()
+        sleep(0.001)
+
+
+def test_delay_completes_after_its_deadline():
+    completions = []
+    timer = StepTimer(lambda: completions.append(timer.remaining_time))
+    timer.start_delay(50)
+    timer.poll()
+    assert not completions
+    poll_until_done(timer)
+
+    assert completions == [0]
+    assert timer.overshoot_stats.count == 1
+    assert timer.overshoot >= 0
+    assert timer.wait_time == pytest.approx(0.05, abs=0.02)
+
+
+def test_paused_time_is_not_counted():
+    timer = StepTimer(lambda: None)
+    timer.start_delay(100)
+    sleep(0.03)
+    timer.pause_resume()
+    remaining = timer.remaining_time
+    sleep(0.1)
+    timer.poll()
+    assert timer.active and timer.remaining_time == remaining
+    timer.pause_resume()
+    poll_until_done(timer)
+
+    assert timer.wait_time == pytest.approx(0.1, abs=0.03)
+
+
+def test_stopped_delay_never_completes():
+    completions = []
+    timer = StepTimer(lambda: completions.append(True))
+    timer.start_delay(10)
+    sleep(0.02)
+    timer.stop()
+    timer.poll()
+
+    assert not completions
+    assert timer.wait_time >= 0.02
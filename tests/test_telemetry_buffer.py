@@ -0,0 +1,36 @@
+import numpy as np
+
+from utils.telemetry_buffer import TelemetryBuffer
+
+CAPACITY = 8
+
+
+def fill(buffer: TelemetryBuffer, count: int) -> None:
+    for index in range(count):
+        buffer.append(float(index), timestamp=float(index))
+
+
+def test_latest_stays_contiguous_after_wrapping():
+    buffer = TelemetryBuffer(CAPACITY)
+    count = 3 * CAPACITY + 3
+    fill(buffer, count)
+
+    for length in range(1, CAPACITY + 1):
+        view = buffer.latest(length)
+        assert view.base is buffer.samples
+        assert list(view["voltage"]) == list(range(count - length, count))
+    assert len(buffer.latest(CAPACITY + 5)) == CAPACITY
+    assert np.all(np.diff(buffer.latest(CAPACITY)["timestamp"]) == 1.0)
+
+
+def test_since_is_limited_to_the_capacity():
+    buffer = TelemetryBuffer(CAPACITY)
+    fill(buffer, 5)
+    marker = buffer.mark()
+    fill(buffer, CAPACITY + 2)
+
+    samples = buffer.since(marker)
+    assert len(samples) == CAPACITY
+    assert list(samples["voltage"]) == list(range(2, CAPACITY + 2))
+    assert np.isnan(samples["current"]).all()
+    assert len(buffer.since(buffer.mark())) == 0
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.telemetry_buffer import TelemetryBuffer
+from utils.waveform_file import (
+    HEADER_SIZE,
+    RECORD_DTYPE,
+    WaveformWriter,
+    load_waveform,
+)
+
+
+def capture(
+    buffer: TelemetryBuffer, start: float, count: int, power: bool = True
+) -> np.ndarray:
+    marker = buffer.mark()
+    for index in range(count):
+        buffer.append(
+            12.0 + index / 100,
+            2.0,
+            24.0 if power else None,
+            timestamp=start + index * 0.05,
+        )
+    return buffer.since(marker)
+
+
+def test_written_samples_read_back(tmp_path):
+    file_path = str(tmp_path / "00000001.wfm")
+    writer = WaveformWriter(file_path, "00000001", [1, 3])
+    start = writer.start_monotonic
+    buffers = {1: TelemetryBuffer(16), 3: TelemetryBuffer(16)}
+    writer.append(0, 1, capture(buffers[1], start, 4))
+    writer.append(0, 3, capture(buffers[3], start, 2, power=False))
+    writer.append(1, 1, capture(buffers[1], start + 1.0, 3))
+    writer.append(1, 3, buffers[3].since(buffers[3].mark()))
+
+    assert not os.path.exists(file_path)
+    writer.close()
+    assert not os.path.exists(file_path + ".part")
+
+    waveform = load_waveform(file_path)
+    assert waveform.serial_number == "00000001"
+    assert waveform.start_time == pytest.approx(writer.start_time)
+    assert waveform.channel_ids == [1, 3]
+    assert isinstance(waveform.records, np.memmap)
+    assert len(waveform.records) == 9
+
+    first_step = waveform.channel(1, 0)
+    assert list(first_step["voltage"]) == pytest.approx([12.0, 12.01, 12.02, 12.03])
+    assert list(first_step["timestamp"]) == pytest.approx([0.0, 0.05, 0.1, 0.15])
+    assert len(waveform.channel(1)) == 7
+    assert np.isnan(waveform.channel(3)["power"]).all()
+    assert len(waveform.channel(3, 1)) == 0
+
+
+def test_partial_record_is_left_out(tmp_path):
+    file_path = str(tmp_path / "00000001.wfm")
+    writer = WaveformWriter(file_path, "00000001", [1])
+    writer.append(0, 1, capture(TelemetryBuffer(16), writer.start_monotonic, 2))
+    writer.close()
+    with open(file_path, "ab") as waveform_file:
+        waveform_file.write(b"\0" * (RECORD_DTYPE.itemsize // 2))
+
+    assert os.path.getsize(file_path) > HEADER_SIZE + 2 * RECORD_DTYPE.itemsize
+    assert len(load_waveform(file_path).records) == 2
+
+
+def test_other_files_are_rejected(tmp_path):
+    file_path = tmp_path / "report.txt"
+    file_path.write_bytes(b"\0" * HEADER_SIZE)
+
+    with pytest.raises(ValueError):
+        load_waveform(str(file_path))
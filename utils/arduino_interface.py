@@ -1,17 +1,85 @@
+from time import monotonic
+
 import serial
 
+# Opening the port resets the board, the bootloader takes about 2 s to hand over.
+RESET_TIMEOUT = 3
+HANDSHAKE_READ_TIMEOUT = 0.2
+
+
+def pin_mask(pin_numbers):
+    """
+    Returns the 4 hex digit bit mask of pin_numbers, e.g. [4, 9] -> "0210"
+    """
+    mask = 0
+    for pin_number in pin_numbers:
+        mask |= 1 << int(pin_number)
+    return f"{mask:04X}"
+
 
 class Arduino:
     """
     Models an Arduino connection
     """
 
-    def __init__(self, serial_port="/dev/ttyACM0", baud_rate=9600, read_timeout=5):
+    def __init__(
+        self,
+        serial_port="/dev/ttyACM0",
+        baud_rate=9600,
+        read_timeout=5,
+        acknowledge=True,
+        handshake=True,
+        conn=None,
+    ):
         """
         Initializes the serial connection to the Arduino board
+        When acknowledge is true, every M and WD command waits for the b'OK'
+        line the firmware sends back once the command was executed.
+        When handshake is true, waits for the board to answer its firmware version.
+        conn replaces the serial port with an already open connection (simulator).
         """
-        self.conn = serial.Serial(serial_port, baud_rate)
+        self.conn = serial.Serial(serial_port, baud_rate) if conn is None else conn
         self.conn.timeout = read_timeout
+        self.acknowledge = acknowledge
+        self.firmware_version = None
+        self.pin_modes = {}
+        if handshake:
+            self.handshake()
+
+    def handshake(self, reset_timeout=RESET_TIMEOUT):
+        """
+        Waits for the board to come back from the reset triggered by opening the
+        port, then stores the firmware version
+        Internally sends b'V' until the firmware answers V:{version}
+        Raises ConnectionError when no answer arrives within reset_timeout seconds
+        """
+        read_timeout = self.conn.timeout
+        self.conn.timeout = HANDSHAKE_READ_TIMEOUT
+        deadline = monotonic() + reset_timeout
+        try:
+            while monotonic() < deadline:
+                self.conn.reset_input_buffer()
+                self.conn.write(b"V")
+                line_received = self.conn.readline().decode(errors="ignore").strip()
+                if line_received.startswith("V:"):
+                    self.firmware_version = line_received[2:]
+                    # The reset cleared every pin mode.
+                    self.pin_modes.clear()
+                    return
+        finally:
+            self.conn.timeout = read_timeout
+        raise ConnectionError("Arduino firmware did not answer the version request")
+
+    def read_ack(self):
+        """
+        Waits for the b'OK' acknowledgement of the last command.
+        Raises TimeoutError when nothing arrives within the read timeout.
+        """
+        line_received = self.conn.readline().decode().strip()
+        if not line_received:
+            raise TimeoutError("Arduino did not acknowledge the command")
+        if line_received != "OK":
+            raise IOError(f"Unexpected Arduino reply: {line_received}")
 
     def set_pin_mode(self, pin_number, mode):
         """
@@ -20,9 +88,15 @@ class Arduino:
         - I for INPUT
         - O for OUTPUT
         - P for INPUT_PULLUP
+        Nothing is sent when pin_number is already configured with mode
         """
+        if self.pin_modes.get(str(pin_number)) == mode:
+            return
         command = ("".join(("M", mode, str(pin_number)))).encode()
         self.conn.write(command)
+        if self.acknowledge:
+            self.read_ack()
+        self.pin_modes[str(pin_number)] = mode
 
     def digital_read(self, pin_number):
         """
@@ -45,3 +119,61 @@ class Arduino:
         """
         command = ("".join(("WD", str(pin_number), ":", str(digital_value)))).encode()
         self.conn.write(command)
+        if self.acknowledge:
+            self.read_ack()
+
+    def set_port_mode(self, pin_numbers, mode):
+        """
+        Performs a pinMode() operation on every pin in pin_numbers with one frame
+        Internally sends b'MP{mode}{mask}' where mask is the hex pin_mask()
+        Only the pins not yet configured with mode are sent
+        """
+        pending = [
+            str(pin) for pin in pin_numbers if self.pin_modes.get(str(pin)) != mode
+        ]
+        if not pending:
+            return
+        command = ("".join(("MP", mode, pin_mask(pending)))).encode()
+        self.conn.write(command)
+        if self.acknowledge:
+            self.read_ack()
+        for pin_number in pending:
+            self.pin_modes[pin_number] = mode
+
+    def port_write(self, pin_values):
+        """
+        Writes every pin: value pair of pin_values(dict) in one atomic frame
+        Internally sends b'WP{mask}:{values}' where mask selects the pins and
+        values holds their bits, e.g. {4: 0, 7: 1} -> b'WP0090:0080'
+        The firmware clears the selected bits before setting any, so a relay
+        is never switched on while another one is still closed.
+        """
+        mask = pin_mask(pin_values)
+        values = pin_mask([pin for pin, value in pin_values.items() if value])
+        command = ("".join(("WP", mask, ":", values))).encode()
+        self.conn.write(command)
+        if self.acknowledge:
+            self.read_ack()
+
+    def port_read(self, pin_numbers):
+        """
+        Performs a digital read on every pin in pin_numbers with one frame and
+        returns a dict of pin_number: value (1 or 0)
+        Internally sends b'RP{mask}', the firmware answers P{mask}:{values}
+        Raises TimeoutError when nothing arrives within the read timeout and
+        IOError on any other reply.
+        """
+        mask = pin_mask(pin_numbers)
+        command = ("".join(("RP", mask))).encode()
+        self.conn.write(command)
+        line_received = self.conn.readline().decode().strip()
+        if not line_received:
+            raise TimeoutError("Arduino did not answer the port read")
+        header, _, value = line_received.partition(":")  # e.g. P0008:0008
+        try:
+            if header != ("P" + mask):
+                raise ValueError(header)
+            bits = int(value, 16)
+        except ValueError as e:
+            raise IOError(f"Unexpected Arduino reply: {line_received}") from e
+        return {pin_number: (bits >> int(pin_number)) & 1 for pin_number in pin_numbers}
@@ -0,0 +1,209 @@
+from enum import Enum
+from math import isnan
+from typing import Callable
+
+from models.test_file_model import LoadParameter
+
+# Bisection ramps by this many resolutions (at least increase_step), then
+# bisects the failing coarse step in log2(COARSE_STEP_FACTOR) set points.
+COARSE_STEP_FACTOR = 8
+# Short circuit test: the output is shut down below this fraction of voltage_lower.
+VOLTAGE_SHUTDOWN_FACTOR = 0.2
+# Time allowed for the output to shut down and recover before the test fails.
+SHORT_TIMEOUT = 15.0
+
+
+class RampState(Enum):
+    RAMPING = 0
+    RECOVERING_PROBE = 1
+    RECOVERING_FINAL = 2
+    DONE = 3
+
+
+class CurrentLimitRamp:
+    """
+    Current limit search of one channel, advanced by feeding it every sample of
+    the channel through update().
+    Ramps the load by increase_step every increase_delay seconds until the voltage
+    falls below voltage_under_limit ("linear"). Or ramps by coarse_step, then
+    bisects between the last good and first failing loads down to
+    search_resolution, increase_step by default ("bisection").
+    Loads are applied through set_load(channel_id, load).
+    """
+
+    def __init__(
+        self,
+        channel_id: int,
+        params: LoadParameter,
+        set_load: Callable[[int, float], None],
+        now: float,
+    ):
+        self.channel_id = channel_id
+        self.params = params
+        self.set_load = set_load
+        self.state = RampState.RAMPING
+        self.load = params.static_load
+        self.next_action_time = now
+        self.peak_current = 0.0
+        self.last_good = params.static_load
+        self.first_fail = None
+        self.trip_load = None
+        self.resolution = params.search_resolution or params.increase_step
+        self.coarse_step = max(
+            params.increase_step, self.resolution * COARSE_STEP_FACTOR
+        )
+        self.set_points = 0
+        self.set_load(channel_id, params.static_load)
+
+    @property
+    def done(self) -> bool:
+        return self.state is RampState.DONE
+
+    def passed(self) -> bool:
+        return self.params.load_lower <= self.peak_current <= self.params.load_upper
+
+    def update(self, voltage: float, current: float, now: float) -> None:
+        if self.state is RampState.DONE:
+            return
+        if not isnan(current):
+            self.peak_current = max(self.peak_current, current)
+        voltage_ok = voltage >= self.params.voltage_under_limit
+
+        if self.state is RampState.RECOVERING_FINAL:
+            if voltage > self.params.voltage_under_limit:
+                self.state = RampState.DONE
+            return
+        if self.state is RampState.RECOVERING_PROBE:
+            if voltage_ok:
+                self.state = RampState.RAMPING
+                self.apply_load((self.last_good + self.first_fail) / 2, now)
+            return
+        if now < self.next_action_time:
+            return
+
+        if self.params.search_mode == "bisection":
+            self.bisection_step(voltage_ok, now)
+        elif voltage_ok and self.load <= self.params.end_load:
+            self.apply_load(self.load + self.params.increase_step, now)
+        else:
+            self.finish(None if voltage_ok else self.load)
+
+    def bisection_step(self, voltage_ok: bool, now: float) -> None:
+        if voltage_ok:
+            self.last_good = self.load
+        else:
+            self.first_fail = self.load
+
+        if self.first_fail is None:
+            if self.load <= self.params.end_load:
+                self.apply_load(self.load + self.coarse_step, now)
+            else:
+                self.finish(None)
+        elif self.first_fail - self.last_good <= self.resolution:
+            self.finish(self.first_fail)
+        elif voltage_ok:
+            self.apply_load((self.last_good + self.first_fail) / 2, now)
+        else:
+            # Let the output recover before probing a lower load.
+            self.state = RampState.RECOVERING_PROBE
+            self.set_load(self.channel_id, self.params.static_load)
+
+    def apply_load(self, load: float, now: float) -> None:
+        self.set_points += 1
+        self.load = load
+        self.set_load(self.channel_id, load)
+        self.next_action_time = now + self.params.increase_delay
+
+    def finish(self, trip_load: float | None) -> None:
+        """
+        Receives trip_load, the first load the output failed at (None if it never
+        did), and returns the channel to static_load waiting for it to recover.
+        """
+        self.trip_load = trip_load
+        self.set_load(self.channel_id, self.params.static_load)
+        self.state = RampState.RECOVERING_FINAL
+
+
+class ShortCircuitTest:
+    """
+    Short circuit test of one channel, advanced by feeding it every sample of
+    the channel through update(), with the sample timestamp as now.
+    Waits for the output to reach voltage_lower (it may still be coming up after
+    the input source switch), shorts it and waits for the shutdown edge (voltage
+    below VOLTAGE_SHUTDOWN_FACTOR * voltage_lower), removes the short and waits
+    for the recovery edge (voltage above voltage_lower). The test completes as
+    soon as both edges are seen, or fails after SHORT_TIMEOUT seconds, through
+    update() or finish() when no sample arrives.
+    The short is switched through toggle_short(channel_id, state, on_switched),
+    which calls on_switched(timestamp) once the switch reached the instrument,
+    both times are measured from those timestamps.
+    """
+
+    def __init__(
+        self,
+        channel_id: int,
+        params: LoadParameter,
+        toggle_short: Callable[[int, bool, Callable[[float], None] | None], None],
+        set_load: Callable[[int, float], None],
+        now: float,
+    ):
+        self.channel_id = channel_id
+        self.params = params
+        self.toggle_short = toggle_short
+        self.start_time = now
+        self.short_requested = False
+        # Set from the instrument thread, None until the switch was sent.
+        self.short_start = None
+        self.short_end = None
+        self.shutdown_time = None
+        self.recovery_time = None
+        self.done = False
+        set_load(channel_id, params.static_load)
+
+    @property
+    def shutdown(self) -> bool:
+        return self.shutdown_time is not None
+
+    @property
+    def recovery(self) -> bool:
+        return self.recovery_time is not None
+
+    def passed(self) -> bool:
+        return self.shutdown and self.recovery
+
+    def on_short_applied(self, timestamp: float) -> None:
+        self.short_start = timestamp
+
+    def on_short_removed(self, timestamp: float) -> None:
+        self.short_end = timestamp
+
+    def update(self, voltage: float, current: float, now: float) -> None:
+        if self.done:
+            return
+        if now - self.start_time > SHORT_TIMEOUT:
+            self.finish()
+            return
+
+        voltage_lower = self.params.voltage_lower
+        if not self.short_requested:
+            if voltage >= voltage_lower:
+                self.short_requested = True
+                self.toggle_short(self.channel_id, True, self.on_short_applied)
+            return
+        # Samples fetched before the short was applied say nothing about it.
+        if self.short_start is None or now < self.short_start:
+            return
+        if not self.shutdown:
+            if voltage < voltage_lower * VOLTAGE_SHUTDOWN_FACTOR:
+                self.shutdown_time = now - self.short_start
+                self.toggle_short(self.channel_id, False, self.on_short_removed)
+        # Nor those fetched before the short was removed.
+        elif self.short_end is not None and now >= self.short_end:
+            if voltage > voltage_lower:
+                self.recovery_time = now - self.short_end
+                self.finish()
+
+    def finish(self) -> None:
+        if self.short_requested and not self.shutdown:
+            self.toggle_short(self.channel_id, False, None)
+        self.done = True
@@ -1,32 +1,80 @@
-from PySide6.QtCore import QTimer, Signal, QObject
+from math import ceil
+
+from PySide6.QtCore import Qt, QTimer, Signal, QObject
+
+from utils.step_timer import StepTimer
+
+# Default interval between remaining_time_changed emissions, in ms.
+DEFAULT_TICK_INTERVAL = 100
 
 
 class DelayManager(QObject):
+    """
+    Qt adapter of a StepTimer: a QTimer polls the deadline every tick_interval
+    and on it, so event loop latency delays the progress updates but never the
+    moment the delay completes. The overshoot and wait time bookkeeping is the
+    StepTimer's (see step_timer).
+    """
+
     delay_completed = Signal()
     remaining_time_changed = Signal(int)
 
-    def __init__(self):
+    def __init__(self, tick_interval: int = DEFAULT_TICK_INTERVAL):
         super().__init__()
-        self.remaining_time = 0
-        self.paused = False
+        self.tick_interval = tick_interval
+        self.step_timer = StepTimer(self.delay_completed.emit)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.run_timer)
+
+    @property
+    def remaining_time(self) -> int:
+        return self.step_timer.remaining_time
+
+    @property
+    def paused(self) -> bool:
+        return self.step_timer.paused
+
+    @property
+    def active(self) -> bool:
+        return self.step_timer.active
+
+    @property
+    def overshoot(self) -> float:
+        return self.step_timer.overshoot
+
+    @property
+    def overshoot_stats(self):
+        return self.step_timer.overshoot_stats
+
+    @property
+    def wait_time(self) -> float:
+        return self.step_timer.wait_time
 
     def start_delay(self, delay):
-        self.remaining_time = delay
+        self.step_timer.start_delay(delay)
         self.run_timer()
 
     def pause_resume(self):
+        self.step_timer.pause_resume()
         if self.paused:
-            self.paused = False
+            self.timer.stop()
+        elif self.active:
             self.run_timer()
-        else:
-            self.paused = True
+
+    def stop(self):
+        self.timer.stop()
+        self.step_timer.stop()
 
     def run_timer(self):
-        if self.paused:
+        if self.paused or not self.active:
             return
-        if self.remaining_time > 0:
-            self.remaining_time -= 100
+        remaining = self.step_timer.remaining()
+        if remaining > 0:
+            self.step_timer.remaining_time = int(remaining)
             self.remaining_time_changed.emit(self.remaining_time)
-            QTimer.singleShot(100, self.run_timer)
+            self.timer.start(min(self.tick_interval, ceil(remaining)))
         else:
-            self.delay_completed.emit()
+            self.remaining_time_changed.emit(0)
+            self.step_timer.poll()
@@ -9,3 +9,20 @@ class TestState(Enum):
     FAILED = "Reprovado"
     WAITKEY = "Aperte ENTER para continuar"
     NONE = ""
+
+
+class SequenceEvent(Enum):
+    """
+    Events notified by SequenceEngine to its listeners, with their arguments.
+    """
+
+    STATE_CHANGED = "state_changed"  # (description: str)
+    STEP_STARTED = "step_started"  # (index: int)
+    LIMITS_CHANGED = "limits_changed"  # (step: Step)
+    LOAD_CHANGED = "load_changed"  # (channel_id: int, load: float)
+    INPUT_SOURCE_READY = "input_source_ready"  # (step: Step), Arduino thread
+    STEP_FINISHED = "step_finished"  # (step_pass: bool)
+    SEQUENCE_FINISHED = "sequence_finished"  # (result_data: dict)
+    STOPPED = "stopped"  # ()
+    ERROR = "error"  # (message: str), Arduino thread
+    RECORD_FAILED = "record_failed"  # (message: str)
@@ -0,0 +1,176 @@
+from queue import Queue
+from threading import Lock
+from time import monotonic
+
+from controllers.sat_controller import (
+    ChannelReading,
+    ElectronicLoadController,
+    merge_readings,
+)
+from utils.scpi_commands import FETCH_VOLT, FETCH_CURR, FETCH_POW
+from utils.step_statistics import StepStatistics
+from utils.telemetry_buffer import TelemetryBuffer
+
+# Current and power are only fetched on every Nth reading, voltage on all of them.
+FULL_READING_INTERVAL = 5
+
+
+class InstrumentWorker:
+    """
+    Owns the IT8700 connection and runs every SCPI transaction on the thread
+    that calls run(), until stop().
+    Commands are executed in the order they were submitted. Readings are merged
+    into a latest-value snapshot and signals.readings_ready is emitted only when
+    the previous snapshot was already taken, so a slow GUI never queues stale
+    updates; the slot collects the snapshot with take_readings().
+    Every sample is also appended to the channel's TelemetryBuffer in telemetry
+    and added to its StepStatistics while a step window is open.
+    """
+
+    def __init__(self, controller: ElectronicLoadController, signals):
+        self.controller = controller
+        self.signals = signals
+        self.commands = Queue()
+        self.channel_ids: tuple[int, ...] = ()
+        self.telemetry: dict[int, TelemetryBuffer] = {}
+        self.step_statistics: dict[int, StepStatistics] = {}
+        self.lock = Lock()
+        self.requested_channels: set[int] = set()
+        self.reading_pending = False
+        self.reading_count = 0
+        self.latest_readings: dict[int, ChannelReading] = {}
+        self.snapshot_pending = False
+
+    def run(self):
+        running = True
+        while running:
+            command, args = self.commands.get()
+            try:
+                if command is None:
+                    running = False
+                else:
+                    command(*args)
+                # Consecutive writes are only sent once the queue runs dry.
+                if not running or self.commands.empty():
+                    self.controller.flush()
+            except Exception as e:
+                self.signals.instrument_error.emit(f"SAT IT8700: {e}")
+
+    def submit(self, command, *args) -> None:
+        """
+        Queues command(*args) to be executed on the instrument thread.
+        No return, errors are reported through signals.instrument_error.
+        """
+        self.commands.put((command, args))
+
+    def submit_flushed(self, on_sent, command, *args) -> None:
+        """
+        Queues command(*args) like submit(), but sends its writes right away and
+        then calls on_sent(timestamp) on the instrument thread, with the time the
+        command reached the instrument.
+        """
+
+        def send():
+            command(*args)
+            self.controller.flush()
+            on_sent(monotonic())
+
+        self.submit(send)
+
+    def set_channel_ids(self, channel_ids: list[int]) -> None:
+        self.telemetry = {channel_id: TelemetryBuffer() for channel_id in channel_ids}
+        self.channel_ids = tuple(channel_ids)
+
+    def request_readings(self, channel_ids: list[int] | None = None) -> None:
+        """
+        Queues a reading of channel_ids (every monitored channel by default).
+        Requests made while a reading is still waiting to be executed are merged
+        into it, so slow transactions never pile up stale requests.
+        """
+        with self.lock:
+            self.requested_channels.update(
+                self.channel_ids if channel_ids is None else channel_ids
+            )
+            if self.reading_pending:
+                return
+            self.reading_pending = True
+        self.submit(self._read_channels)
+
+    def _read_channels(self) -> None:
+        with self.lock:
+            channel_ids = [
+                channel_id
+                for channel_id in self.channel_ids
+                if channel_id in self.requested_channels
+            ]
+            self.requested_channels.clear()
+            self.reading_pending = False
+
+        if self.reading_count % FULL_READING_INTERVAL == 0:
+            queries = (FETCH_VOLT, FETCH_CURR, FETCH_POW)
+        else:
+            queries = (FETCH_VOLT,)
+        self.reading_count += 1
+        # Samples are stamped at the middle of the query transaction, when the
+        # instrument measured them, pending writes are sent beforehand.
+        self.controller.flush()
+        sent = monotonic()
+        readings = self.controller.get_channels_values(channel_ids, queries)
+        timestamp = (sent + monotonic()) / 2
+        telemetry = self.telemetry
+        with self.lock:
+            for channel_id, reading in readings.items():
+                # The test file may have been swapped while the reading ran.
+                if channel_id in telemetry:
+                    telemetry[channel_id].append(
+                        reading.voltage, reading.current, reading.power, timestamp
+                    )
+                if channel_id in self.step_statistics:
+                    self.step_statistics[channel_id].add(reading.voltage, timestamp)
+        self.publish_readings(readings)
+
+    def publish_readings(self, readings: dict[int, ChannelReading]) -> None:
+        with self.lock:
+            for channel_id, reading in readings.items():
+                self.latest_readings[channel_id] = merge_readings(
+                    self.latest_readings.get(channel_id), reading
+                )
+            notify = not self.snapshot_pending
+            self.snapshot_pending = True
+        if notify:
+            self.signals.readings_ready.emit()
+
+    def start_step_statistics(
+        self, limits: dict[int, tuple[float, float]], settle_time: float = 0.0
+    ) -> None:
+        """
+        Opens a statistics window for every channel in limits(dict) of
+        channel_id: (voltage_lower, voltage_upper), ignoring the samples of the
+        first settle_time seconds.
+        """
+        start_time = monotonic() + settle_time
+        with self.lock:
+            self.step_statistics = {
+                channel_id: StepStatistics(lower, upper, start_time)
+                for channel_id, (lower, upper) in limits.items()
+            }
+
+    def finish_step_statistics(self) -> dict[int, StepStatistics]:
+        """
+        Closes the statistics window and returns its StepStatistics by channel id.
+        """
+        with self.lock:
+            statistics, self.step_statistics = self.step_statistics, {}
+        return statistics
+
+    def take_readings(self) -> dict[int, ChannelReading]:
+        """
+        Returns the readings published since the last call, keyed by channel id.
+        """
+        with self.lock:
+            readings, self.latest_readings = self.latest_readings, {}
+            self.snapshot_pending = False
+        return readings
+
+    def stop(self) -> None:
+        self.submit(None)
@@ -1,40 +1,126 @@
-from time import sleep
+from threading import Condition
+from time import monotonic
 
-from PySide6.QtCore import QRunnable, QMutex, QWaitCondition, QMutexLocker
+from utils.timing_stats import LatenessStats
 
+# Default time between two readings of the same channel, in seconds (20 Hz).
+DEFAULT_SAMPLE_PERIOD = 0.05
 
-class MonitorWorker(QRunnable):
-    def __init__(self, signals):
-        super().__init__()
-        self.mutex = QMutex()
-        self.wait_condition = QWaitCondition()
-        self.signals = signals
+
+class MonitorWorker:
+    """
+    Schedules the channel readings of an InstrumentWorker, run() loops on the
+    calling thread until stop().
+    Each channel is read every sample period (set_sample_period), ticks follow
+    monotonic deadlines and ticks missed while the loop was late are skipped
+    instead of being fired in a burst. A channel whose period is set or cleared
+    is read on the next tick, fired right away. The lateness of each tick is
+    accumulated in jitter_stats and the missed ticks in skipped_ticks, until
+    reset_jitter_stats(). idle_time accumulates the seconds spent waiting for
+    the next tick, pauses excluded.
+    """
+
+    def __init__(self, instrument_worker, sample_period: float = DEFAULT_SAMPLE_PERIOD):
+        self.wait_condition = Condition()
+        self.instrument_worker = instrument_worker
+        self.default_sample_period = sample_period
+        self.sample_periods: dict[int, float] = {}
+        self.rescheduled_channels: set[int] = set()
         self.paused = False
         self.running = True
+        self.jitter_stats = LatenessStats()
+        self.skipped_ticks = 0
+        self.idle_time = 0.0
 
     def run(self):
-        while self.running:
-            self.mutex.lock()
-            while self.paused:
-                self.wait_condition.wait(
-                    self.mutex
-                )  # Pausa até que seja sinalizado para continuar
-            self.mutex.unlock()
+        next_tick = monotonic()
+        next_samples: dict[int, float] = {}
+        while True:
+            with self.wait_condition:
+                if self.paused:
+                    # Pausa até que seja sinalizado para continuar
+                    while self.paused:
+                        self.wait_condition.wait()
+                    next_tick = monotonic()
+                if not self.running:
+                    break
+                rescheduled = self.rescheduled_channels
+                self.rescheduled_channels = set()
+            if rescheduled:
+                next_tick = monotonic()
+                for channel_id in rescheduled:
+                    next_samples.pop(channel_id, None)
+
+            now = monotonic()
+            self.jitter_stats.add(now - next_tick)
+
+            # Channels are scheduled on tick deadlines, not wake-up times, so the
+            # lateness of one tick does not push a channel past the next one.
+            due_channels = [
+                channel_id
+                for channel_id in self.instrument_worker.channel_ids
+                if next_samples.get(channel_id, 0) <= next_tick
+            ]
+            for channel_id in due_channels:
+                next_samples[channel_id] = next_tick + self.get_sample_period(
+                    channel_id
+                )
+            if due_channels:
+                self.instrument_worker.request_readings(due_channels)
+
+            # Under the lock, set_sample_period is called from other threads.
+            with self.wait_condition:
+                tick_period = min(
+                    (
+                        self.get_sample_period(channel_id)
+                        for channel_id in self.instrument_worker.channel_ids
+                    ),
+                    default=self.default_sample_period,
+                )
+            next_tick += tick_period
+            if next_tick < now:
+                missed = int((now - next_tick) / tick_period) + 1
+                self.skipped_ticks += missed
+                next_tick += missed * tick_period
+            # Waits on the condition rather than sleeping, so pause(), stop() and
+            # the sample period changes take effect right away.
+            with self.wait_condition:
+                if self.running and not self.paused and not self.rescheduled_channels:
+                    idle_start = monotonic()
+                    self.wait_condition.wait(max(0.0, next_tick - idle_start))
+                    self.idle_time += monotonic() - idle_start
+
+    def get_sample_period(self, channel_id: int) -> float:
+        return self.sample_periods.get(channel_id, self.default_sample_period)
+
+    def set_sample_period(self, channel_id: int, period: float) -> None:
+        with self.wait_condition:
+            self.sample_periods[channel_id] = period
+            self.rescheduled_channels.add(channel_id)
+            self.wait_condition.notify_all()
+
+    def clear_sample_period(self, channel_id: int) -> None:
+        with self.wait_condition:
+            self.sample_periods.pop(channel_id, None)
+            self.rescheduled_channels.add(channel_id)
+            self.wait_condition.notify_all()
 
-            self.signals.update_output.emit()
-            sleep(0.1)
+    def reset_jitter_stats(self) -> None:
+        self.jitter_stats.reset()
+        self.skipped_ticks = 0
 
     def pause(self):
-        with QMutexLocker(self.mutex):
+        with self.wait_condition:
             self.paused = True
+            self.wait_condition.notify_all()
 
     def resume(self):
-        with QMutexLocker(self.mutex):
+        with self.wait_condition:
             self.paused = False
-            self.wait_condition.wakeAll()  # Notifica a thread para continuar
+            self.wait_condition.notify_all()  # Notifica a thread para continuar
 
     def stop(self):
-        with QMutexLocker(self.mutex):
+        with self.wait_condition:
             self.running = False
             self.paused = False
-            self.wait_condition.wakeAll()  # Garante que a thread saia do estado de pausa
+            self.wait_condition.notify_all()  # Garante que a thread saia do estado de pausa
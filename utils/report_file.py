@@ -1,127 +1,308 @@
-from datetime import datetime
+import csv
+import json
+import os
 import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from io import StringIO
+from typing import Any, Callable
+
+# Formats archived next to each other for every approved unit.
+ARCHIVE_FORMATS = ("text", "jsonl")
+REPORT_EXTENSIONS = {"text": ".txt", "jsonl": ".jsonl", "csv": ".csv"}
+# Columns of the structured reports before the step fields.
+RECORD_COLUMNS = (
+    "serial_number",
+    "group",
+    "model",
+    "customer",
+    "operator",
+    "test_date",
+    "test_status",
+    "step_index",
+    "step",
+    "step_type",
+    "step_status",
+    "channel_id",
+)
+
+
+@dataclass
+class ReportField:
+    """
+    One measurement of a step type: label is the text report row, key the
+    channel data entry (and structured report column), unit is printed after the
+    text value, formatted by formatter.
+    """
+
+    label: str
+    key: str
+    unit: str = ""
+    formatter: Callable[[Any], str] = str
+
+
+@dataclass
+class StepResult:
+    # Index of the step in the test file, not in the run.
+    index: int
+    description: str
+    status: bool
+    step_type: int
+    channels: tuple[dict, ...]
+
+
+@dataclass
+class TestResult:
+    """
+    Results of a tested unit, shared by every report format.
+    """
+
+    group: str
+    model: str
+    customer: str
+    serial_number: str
+    operator: str
+    test_date: datetime
+    steps: list[StepResult] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return all(step.status for step in self.steps)
+
+    @classmethod
+    def from_data(cls, data: dict) -> "TestResult":
+        """
+        Receives data (test_result_data), the date is the current one.
+        """
+        return cls(
+            group=data.get("group"),
+            model=data.get("model"),
+            customer=data.get("customer"),
+            serial_number=data.get("serial_number"),
+            operator=data.get("operator"),
+            test_date=datetime.now(),
+            steps=[
+                StepResult(
+                    step["index"],
+                    step["description"],
+                    step["status"],
+                    step["type"],
+                    tuple(step["channels"]),
+                )
+                for step in data.get("steps")
+            ],
+        )
+
+
+STEP_FIELDS: dict[int, list[ReportField]] = {}
+REPORT_WRITERS: dict[str, Callable[[TestResult], str]] = {}
+
+
+def register_step_type(step_type: int, fields: list[ReportField]) -> None:
+    """
+    Registers the measurements reported for step_type, in report order.
+    """
+    STEP_FIELDS[step_type] = fields
+
+
+def report_writer(name: str):
+    """
+    Registers the decorated function(TestResult) -> str as the name format.
+    """
+
+    def register(writer: Callable[[TestResult], str]):
+        REPORT_WRITERS[name] = writer
+        return writer
+
+    return register
+
+
+def fixed(digits: int) -> Callable[[Any], str]:
+    return lambda value: "----" if value is None else f"{value:.{digits}f}"
+
 
+def pass_fail(value: bool) -> str:
+    return "PASS" if value else "FAIL"
 
-def generate_report_file(data: dict):
-    temp_file = tempfile.NamedTemporaryFile(delete=False, mode="w", encoding="utf-8")
+
+def milliseconds(seconds: float | None) -> str:
+    return "----" if seconds is None else "%.1f" % (seconds * 1000)
+
+
+register_step_type(
+    1,
+    [
+        ReportField("Load Current", "load", "A"),
+        ReportField("Upper", "voltage_upper", "V"),
+        ReportField("Lower", "voltage_lower", "V"),
+        ReportField("Outcome", "voltage_output", "V", fixed(2)),
+        ReportField("Mean", "voltage_mean", "V", fixed(2)),
+        ReportField("Minimum", "voltage_min", "V", fixed(2)),
+        ReportField("Maximum", "voltage_max", "V", fixed(2)),
+        ReportField("Ripple", "voltage_ripple", "V", fixed(3)),
+        ReportField("In Band", "in_band", "%", fixed(1)),
+        ReportField("Current", "current", "A", fixed(2)),
+        ReportField("Power", "power", "W", fixed(2)),
+    ],
+)
+register_step_type(
+    2,
+    [
+        ReportField("Under Voltage", "under_voltage", "V"),
+        ReportField("Upper", "load_upper", "A"),
+        ReportField("Lower", "load_lower", "A"),
+        ReportField("Outcome", "load", "A", fixed(2)),
+        ReportField("Trip Point", "trip_load", "A", fixed(3)),
+    ],
+)
+register_step_type(
+    3,
+    [
+        ReportField("Voltage Ref. ", "voltage_ref", "V"),
+        ReportField("Shutdown", "shutdown", "", pass_fail),
+        ReportField("Recovery", "recovery", "", pass_fail),
+        ReportField("Shutdown Time", "shutdown_time", "ms", milliseconds),
+        ReportField("Recovery Time", "recovery_time", "ms", milliseconds),
+        ReportField("Load", "load", "A"),
+    ],
+)
+
+
+def generate_report(data: dict, report_format: str = "text") -> str:
+    """
+    Renders the report of data (test_result_data) in memory, in one of the
+    REPORT_WRITERS formats.
+    """
+    return REPORT_WRITERS[report_format](TestResult.from_data(data))
+
+
+def generate_reports(data: dict, report_formats=ARCHIVE_FORMATS) -> dict[str, str]:
+    """
+    Renders data in every one of report_formats, returns a dict of format: report.
+    """
+    result = TestResult.from_data(data)
+    return {
+        report_format: REPORT_WRITERS[report_format](result)
+        for report_format in report_formats
+    }
+
+
+@report_writer("text")
+def write_text_report(result: TestResult) -> str:
+    report = StringIO()
 
     divider = "|" + "=" * 67 + "|\n"
-    group = data.get("group")
-    model = data.get("model")
-    customer = data.get("customer")
-    sn = data.get("serial_number")
-    test_date = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    operator = data.get("operator")
-    steps = data.get("steps")
-    lines = []
-
-    temp_file.write(divider)
-    temp_file.write("| CEBRA - Power Supply Test Report" + " " * 34 + "|\n")
-    temp_file.write(f"| Group: {group + ' ' * (59-len(group))}|\n")
-    temp_file.write(f"| Model: {model + ' ' * (59-len(model))}|\n")
-    temp_file.write(f"| Customer: {customer + ' ' * (56-len(customer))}|\n")
-    temp_file.write(f"| Series Nº: {sn + ' ' * (55-len(sn))}|\n")
-    temp_file.write(f"| Test Date: {test_date + ' ' * (68-13-len(test_date))}|\n")
-    temp_file.write(f"| Tested By: {operator + ' ' * (68-13-len(operator))}|\n")
-    for step in steps:
-        temp_file.write(divider)
-        description = step["description"]
-        status = step["status"]
-        step_type = step["type"]
-        lines.append(
-            f"|-> {description + ' ' * (55-len(description))}{'[ PASS ]' if status else '[ FAIL ]'} |\n"
+    group = result.group
+    model = result.model
+    customer = result.customer
+    sn = result.serial_number
+    test_date = result.test_date.strftime("%d/%m/%Y %H:%M:%S")
+    operator = result.operator
+
+    report.write(divider)
+    report.write("| CEBRA - Power Supply Test Report" + " " * 34 + "|\n")
+    report.write(f"| Group: {group + ' ' * (59-len(group))}|\n")
+    report.write(f"| Model: {model + ' ' * (59-len(model))}|\n")
+    report.write(f"| Customer: {customer + ' ' * (56-len(customer))}|\n")
+    report.write(f"| Series Nº: {sn + ' ' * (55-len(sn))}|\n")
+    report.write(f"| Test Date: {test_date + ' ' * (68-13-len(test_date))}|\n")
+    report.write(f"| Tested By: {operator + ' ' * (68-13-len(operator))}|\n")
+    for step in result.steps:
+        report.write(divider)
+        description = step.description
+        report.write(
+            f"|-> {description + ' ' * (55-len(description))}{'[ PASS ]' if step.status else '[ FAIL ]'} |\n"
         )
-        match step_type:
-            case 1:
-                channels_line = "|" + "=" * 14
-                static_load_line = "|Load Current: "
-                voltage_upper_line = "|Upper: " + " " * 7
-                voltage_lower_line = "|Lower: " + " " * 7
-                voltage_output_line = "|Outcome: " + " " * 5
-                power_line = "|Power: " + " " * 7
-                for channel in step["channels"]:
-                    static_load = str(channel["load"])
-                    voltage_upper = str(channel["voltage_upper"])
-                    voltage_lower = str(channel["voltage_lower"])
-                    voltage_output = str("%.2f" % channel["voltage_output"])
-                    power = str("%.2f" % channel["power"])
-
-                    channels_line += f"[Channel {channel['channel_id']}]=="
-                    static_load_line += f"[ {static_load+' '*(8-len(static_load))}]A "
-                    voltage_upper_line += (
-                        f"[ {voltage_upper+' '*(8-len(voltage_upper))}]V "
-                    )
-                    voltage_lower_line += (
-                        f"[ {voltage_lower+' '*(8-len(voltage_lower))}]V "
-                    )
-                    voltage_output_line += (
-                        f"[ {voltage_output+' '*(8-len(voltage_output))}]V "
-                    )
-                    power_line += f"[ {power+' '*(8-len(power))}]W "
-            case 2:
-                channels_line = "|" + "=" * 15
-                under_voltage_line = "|Under Voltage: "
-                load_upper_line = "|Upper: " + " " * 8
-                load_lower_line = "|Lower: " + " " * 8
-                load_limit_line = "|Outcome: " + " " * 6
-                for channel in step["channels"]:
-                    under_voltage = str(channel["under_voltage"])
-                    load_upper = str(channel["load_upper"])
-                    load_lower = str(channel["load_lower"])
-                    load_limit = str(channel["load"])
-
-                    channels_line += f"[Channel {channel['channel_id']}]=="
-                    under_voltage_line += (
-                        f"[ {under_voltage+' '*(8-len(under_voltage))}]V "
-                    )
-                    load_upper_line += f"[ {load_upper+' '*(8-len(load_upper))}]A "
-                    load_lower_line += f"[ {load_lower+' '*(8-len(load_lower))}]A "
-                    load_limit_line += f"[ {load_limit+' '*(8-len(load_limit))}]A "
-            case 3:
-                channels_line = "|" + "=" * 15
-                voltage_ref_line = "|Voltage Ref. : "
-                shutdown_line = "|Shutdown: " + " " * 5
-                recovery_line = "|Recovery: " + " " * 5
-                short_load_line = "|Load: " + " " * 9
-                for channel in step["channels"]:
-                    voltage_ref = str(channel["voltage_ref"])
-                    shutdown = "PASS" if channel["shutdown"] else "FAIL"
-                    recovery = "PASS" if channel["recovery"] else "FAIL"
-                    load = str(channel["load"])
-
-                    channels_line += f"[Channel {channel['channel_id']}]=="
-                    voltage_ref_line += f"[ {voltage_ref+' '*(8-len(voltage_ref))}]V "
-                    shutdown_line += f"[ {shutdown+' '*(8-len(shutdown))}]  "
-                    recovery_line += f"[ {recovery+' '*(8-len(recovery))}]  "
-                    short_load_line += f"[ {load+' '*(8-len(load))}]A "
-
-        lines.append(f"{channels_line + '=' * (68 - len(channels_line))}|\n")
-        match step_type:
-            case 1:
-                lines.append(format_line(static_load_line))
-                lines.append(format_line(voltage_upper_line))
-                lines.append(format_line(voltage_lower_line))
-                lines.append(format_line(voltage_output_line))
-                lines.append(format_line(power_line))
-            case 2:
-                lines.append(format_line(under_voltage_line))
-                lines.append(format_line(load_upper_line))
-                lines.append(format_line(load_lower_line))
-                lines.append(format_line(load_limit_line))
-            case 3:
-                lines.append(format_line(voltage_ref_line))
-                lines.append(format_line(shutdown_line))
-                lines.append(format_line(recovery_line))
-                lines.append(format_line(short_load_line))
-
-        temp_file.writelines(lines)
-        lines.clear()
-
-    temp_file.write(divider)
-
-    temp_file.seek(0)
-    temp_file.flush()
-    return temp_file
+        fields = STEP_FIELDS.get(step.step_type, [])
+        label_width = max((len(f.label) + 2 for f in fields), default=0)
+
+        channels_line = "|" + "=" * label_width
+        for channel in step.channels:
+            channels_line += f"[Channel {channel['channel_id']}]=="
+        report.write(f"{channels_line + '=' * (68 - len(channels_line))}|\n")
+
+        for report_field in fields:
+            line = "|" + f"{report_field.label}: ".ljust(label_width)
+            for channel in step.channels:
+                value = report_field.formatter(channel.get(report_field.key))
+                line += f"[ {value+' '*(8-len(value))}]{report_field.unit:<2}"
+            report.write(format_line(line))
+
+    report.write(divider)
+
+    return report.getvalue()
+
+
+def step_records(result: TestResult):
+    """
+    Yields one flat record per channel of every step, the rows of the
+    structured reports.
+    """
+    for step in result.steps:
+        for channel in step.channels:
+            record = {
+                "serial_number": result.serial_number,
+                "group": result.group,
+                "model": result.model,
+                "customer": result.customer,
+                "operator": result.operator,
+                "test_date": result.test_date.isoformat(timespec="seconds"),
+                "test_status": result.passed,
+                "step_index": step.index,
+                "step": step.description,
+                "step_type": step.step_type,
+                "step_status": step.status,
+                "channel_id": channel["channel_id"],
+            }
+            for report_field in STEP_FIELDS.get(step.step_type, []):
+                record[report_field.key] = channel.get(report_field.key)
+            yield record
+
+
+@report_writer("jsonl")
+def write_json_lines_report(result: TestResult) -> str:
+    return "".join(
+        json.dumps(record, ensure_ascii=False) + "\n" for record in step_records(result)
+    )
+
+
+@report_writer("csv")
+def write_csv_report(result: TestResult) -> str:
+    columns = list(RECORD_COLUMNS)
+    for fields in STEP_FIELDS.values():
+        columns += [f.key for f in fields if f.key not in columns]
+    report = StringIO()
+    writer = csv.DictWriter(report, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(step_records(result))
+    return report.getvalue()
+
+
+def save_report_file(text: str, file_path: str) -> None:
+    """
+    Writes text to file_path atomically: it is written to a temporary file in the
+    same directory, then renamed over file_path, so a crash never leaves a
+    truncated report behind.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+            temp_file.write(text)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def save_report_files(reports: dict[str, str], base_path: str) -> None:
+    """
+    Saves every format: report of reports to base_path plus the format extension.
+    """
+    for report_format, text in reports.items():
+        save_report_file(text, base_path + REPORT_EXTENSIONS[report_format])
 
 
 def format_line(text: str) -> str:
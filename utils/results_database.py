@@ -0,0 +1,191 @@
+import logging
+import os
+import sqlite3
+from queue import Empty, Queue
+from threading import Thread
+from time import time
+
+from utils.enums import TestState
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.expanduser("~"), "it8700_results.db")
+# Runs written in one transaction at most, and how long the writer waits for more
+# runs to join a batch, in seconds.
+BATCH_SIZE = 50
+BATCH_WAIT = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    serial_number TEXT NOT NULL,
+    model TEXT,
+    group_name TEXT,
+    customer TEXT,
+    operator TEXT,
+    timestamp REAL NOT NULL,
+    status TEXT NOT NULL,
+    single_step INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_serial_number ON runs (serial_number);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (model, timestamp);
+CREATE INDEX IF NOT EXISTS runs_group_name ON runs (group_name, timestamp);
+CREATE INDEX IF NOT EXISTS runs_operator ON runs (operator, timestamp);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    step_index INTEGER NOT NULL,
+    description TEXT,
+    step_type INTEGER NOT NULL,
+    status INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_run_id ON steps (run_id);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    step_id INTEGER NOT NULL REFERENCES steps (id),
+    channel_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS measurements_step_id ON measurements (step_id);
+CREATE INDEX IF NOT EXISTS measurements_name ON measurements (name, channel_id);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsDatabaseError(Exception):
+    pass
+
+
+class ResultsDatabase:
+    """
+    Append-only SQLite record of every run: the unit, its status (passed,
+    failed or canceled), the verdict of each step and every measured value of
+    each channel (measurements, one row per value).
+    Runs are handed over with record() and written by a background thread,
+    batching the runs that arrive close together in one transaction.
+    A batch that fails to be written is logged and dropped, the writer keeps
+    running and the next record() or close() raises ResultsDatabaseError.
+    """
+
+    def __init__(self, path: str = DEFAULT_DATABASE_PATH):
+        self.path = path
+        self.runs = Queue()
+        self.error = None
+        self.thread = Thread(target=self.run, name="results-database", daemon=True)
+        self.thread.start()
+
+    def record(self, data: dict, state: TestState, single_step: bool) -> None:
+        """
+        Queues the run of data (test_result_data) ended with state, without
+        waiting for it to be written.
+        Raises ResultsDatabaseError if an earlier run failed to be written.
+        """
+        snapshot = dict(data, steps=list(data.get("steps", [])))
+        self.runs.put((snapshot, state.name, single_step, time()))
+        self.raise_error()
+
+    def run(self):
+        connection = None
+        running = True
+        while running:
+            batch = [self.runs.get()]
+            while batch[-1] is not None and len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.runs.get(timeout=BATCH_WAIT))
+                except Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            if batch:
+                try:
+                    if connection is None:
+                        connection = connect(self.path)
+                    with connection:
+                        for run in batch:
+                            insert_run(connection, *run)
+                except Exception as e:
+                    logger.exception(
+                        "%d run(s) not written to %s", len(batch), self.path
+                    )
+                    self.error = e
+            for _ in range(len(batch) + (not running)):
+                self.runs.task_done()
+        if connection is not None:
+            connection.close()
+
+    def wait(self) -> None:
+        """
+        Blocks until every recorded run was written.
+        """
+        self.runs.join()
+
+    def close(self) -> None:
+        """
+        Writes the runs left and stops the writer.
+        Raises ResultsDatabaseError if any run failed to be written.
+        """
+        self.runs.put(None)
+        self.thread.join()
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        error, self.error = self.error, None
+        if error is not None:
+            raise ResultsDatabaseError(
+                f"Falha ao gravar resultados em {self.path}: {error}"
+            ) from error
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
+
+
+def insert_run(
+    connection: sqlite3.Connection,
+    data: dict,
+    status: str,
+    single_step: bool,
+    timestamp: float,
+) -> None:
+    run_id = connection.execute(
+        "INSERT INTO runs (serial_number, model, group_name, customer, operator,"
+        " timestamp, status, single_step) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            data.get("serial_number"),
+            data.get("model"),
+            data.get("group"),
+            data.get("customer"),
+            data.get("operator"),
+            timestamp,
+            status,
+            int(single_step),
+        ),
+    ).lastrowid
+    for step in data["steps"]:
+        step_id = connection.execute(
+            "INSERT INTO steps (run_id, step_index, description, step_type, status)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (run_id, step["index"], step["description"], step["type"], step["status"]),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO measurements (step_id, channel_id, name, value)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                (step_id, int(channel["channel_id"]), name, value)
+                for channel in step["channels"]
+                for name, value in channel.items()
+                if name != "channel_id"
+                and (value is None or isinstance(value, (int, float)))
+            ],
+        )
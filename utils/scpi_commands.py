@@ -12,9 +12,15 @@ SHORT_ON = "INP:SHOR 1"
 SHORT_OFF = "INP:SHOR 0"
 SELECT_CHANNEL = "CHAN "
 SET_CURR = "CURR "
+SET_FUNC = "FUNC "
 
 # QUERY
 INST_ID = "*IDN?"
+OPERATION_COMPLETE = "*OPC?"
+GET_CURR = "CURR?"
+GET_INPUT = "INP?"
+GET_SHORT = "INP:SHOR?"
+GET_FUNC = "FUNC?"
 FETCH_VOLT = "FETC:VOLT?"
 FETCH_CURR = "FETC:CURR?"
 FETCH_POW = "FETC:POW?"
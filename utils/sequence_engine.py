@@ -0,0 +1,607 @@
+from concurrent.futures import Future
+from time import monotonic
+from typing import Callable
+
+import numpy as np
+
+from controllers.sat_controller import ChannelReading, merge_readings
+from models.test_file_model import LoadParameter, Step, TestData
+from utils.channel_tests import SHORT_TIMEOUT, CurrentLimitRamp, ShortCircuitTest
+from utils.enums import SequenceEvent, TestState
+from utils.results_database import ResultsDatabaseError
+from utils.step_statistics import SETTLE_TIME
+from utils.waveform_file import WaveformWriter
+
+# Sample period of a channel in burst acquisition, readings are requested faster
+# than the link answers them so the back-pressure sets the actual rate.
+BURST_SAMPLE_PERIOD = 0.002
+ACTIVE_STATES = (TestState.RUNNING, TestState.PAUSED, TestState.WAITKEY)
+# Every step loads the channels in constant current.
+CC_FUNCTION = "CURR"
+
+
+class SequenceEngine:
+    """
+    Runs the steps of a TestData on the instruments, without any Qt dependency.
+    Instrument commands go through instrument_worker, the monitor schedules the
+    readings and timer (DelayManager or StepTimer) counts the CC step durations.
+    The host wires the asynchronous inputs back to the engine, on the thread the
+    engine runs on:
+    - the readings taken from instrument_worker to process_readings()
+    - the timer completion to on_delay_completed()
+    - SequenceEvent.INPUT_SOURCE_READY to start_step()
+    - instrument errors to instrument_failed()
+    timer.overshoot_stats and the monitor jitter statistics are reset when a run
+    starts, so they hold how late the step delays and the reading ticks of the
+    last run were.
+    Every finished or canceled run is recorded to results_database, when given.
+    Runs started with a capture_path stream every acquisition sample to that
+    waveform file.
+    Progress is notified to the listeners added with subscribe() as
+    listener(event: SequenceEvent, *args).
+    """
+
+    def __init__(
+        self,
+        sat_controller,
+        arduino_controller,
+        instrument_worker,
+        monitor,
+        timer,
+        results_database=None,
+    ):
+        self.sat_controller = sat_controller
+        self.arduino_controller = arduino_controller
+        self.instrument_worker = instrument_worker
+        self.monitor = monitor
+        self.timer = timer
+        self.results_database = results_database
+        self.listeners: list[Callable] = []
+        self.active_test: TestData | None = None
+        self.state = TestState.NONE
+        self.is_single_step = False
+        self.selected_step_index = -1
+        self.current_index = 0
+        self.test_result_data = dict()
+        self.test_sequence_status: list[bool] = []
+        self.readings: dict[int, ChannelReading] = {}
+        self.limits: dict[int, LoadParameter] = {}
+        self.loads: dict[int, float] = {}
+        self.channel_tests = []
+        self.channel_tests_step = None
+        self.burst_markers = {}
+        self.settle_step = None
+        self.settle_start = 0.0
+        self.settle_markers = {}
+        self.waveform_writer: WaveformWriter | None = None
+        self.capture_markers: dict[int, int] = {}
+        self.reconnect_pending = False
+        self.capture_step = 0
+
+    def subscribe(self, listener: Callable) -> None:
+        self.listeners.append(listener)
+
+    def notify(self, event: SequenceEvent, *args) -> None:
+        for listener in self.listeners:
+            listener(event, *args)
+
+    def load_test(self, test: TestData) -> None:
+        self.active_test = test
+        channel_ids = self.get_active_channel_ids()
+        self.readings = {
+            channel_id: ChannelReading(0.0, 0.0, 0.0) for channel_id in channel_ids
+        }
+        self.limits = {}
+        self.loads = {channel_id: 0.0 for channel_id in channel_ids}
+        self.instrument_worker.set_channel_ids(channel_ids)
+
+    def get_active_channel_ids(self) -> list[int]:
+        return list(map(lambda channel: channel.id, self.active_test.active_channels))
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def set_state(self, state: TestState, description: str = "") -> None:
+        self.state = state
+        self.notify(SequenceEvent.STATE_CHANGED, description)
+
+    def start(
+        self,
+        serial_number: str,
+        operator: str,
+        step_index: int | None = None,
+        capture_path: str | None = None,
+    ) -> None:
+        """
+        Runs every step of the loaded test, or only the step at step_index.
+        When capture_path is given, the samples of every active channel are
+        written to that waveform file (see utils.waveform_file).
+        """
+        if self.active or self.active_test is None:
+            return
+        self.is_single_step = step_index is not None
+        self.selected_step_index = -1 if step_index is None else step_index
+        self.test_result_data.update(
+            group=self.active_test.group,
+            model=self.active_test.model,
+            customer=self.active_test.customer,
+            operator=operator,
+            serial_number=serial_number,
+            steps=[],
+        )
+        # The instrument may have been operated from its panel since the last
+        # run, the cached settings are read back before any write is skipped.
+        if self.reconnect_pending:
+            # reconnect() reads back every cached channel as well.
+            self.reconnect_pending = False
+            self.instrument_worker.submit(self.sat_controller.reconnect)
+        else:
+            self.instrument_worker.submit(
+                self.sat_controller.verify_state, self.get_active_channel_ids()
+            )
+        for channel_id in self.get_active_channel_ids():
+            self.instrument_worker.submit(
+                self.sat_controller.set_function_mode, channel_id, CC_FUNCTION
+            )
+        self.instrument_worker.submit(
+            self.sat_controller.toggle_active_channels_input,
+            self.get_active_channel_ids(),
+            True,
+        )
+        self.current_index = 0
+        self.timer.overshoot_stats.reset()
+        self.monitor.reset_jitter_stats()
+        if capture_path is not None:
+            self.start_capture(capture_path, serial_number)
+        self.set_state(TestState.RUNNING)
+        self.monitor.resume()
+        self.run_steps()
+
+    def toggle_pause(self) -> None:
+        if self.state not in [TestState.RUNNING, TestState.PAUSED]:
+            return
+        self.timer.pause_resume()
+        self.set_state(
+            TestState.RUNNING if self.state is TestState.PAUSED else TestState.PAUSED
+        )
+
+    def instrument_failed(self) -> None:
+        """
+        Cancels the run after an instrument error, the connection is reopened
+        when the next run starts.
+        """
+        self.reconnect_pending = True
+        self.cancel()
+
+    def cancel(self) -> None:
+        if not self.active:
+            return
+        self.set_state(TestState.CANCELED)
+        self.record_run()
+        self.reset()
+
+    def continue_step(self) -> None:
+        """
+        Completes a CC step waiting for the operator (duration 0).
+        """
+        if self.state is not TestState.WAITKEY:
+            return
+        self.set_state(TestState.RUNNING)
+        self.on_delay_completed()
+
+    def get_steps(self) -> list[Step]:
+        if self.is_single_step:
+            return [self.active_test.steps[self.selected_step_index]]
+        return self.active_test.steps
+
+    def test_step_index(self) -> int:
+        """
+        Returns the index in the test file of the running step.
+        """
+        return self.selected_step_index if self.is_single_step else self.current_index
+
+    def run_steps(self) -> None:
+        steps = self.get_steps()
+        if self.current_index < len(steps):
+            step: Step = steps[self.current_index]
+            # Samples read up to now belong to the previous step.
+            self.capture_samples()
+            self.capture_step = self.test_step_index()
+            self.notify(SequenceEvent.STEP_STARTED, self.current_index)
+            self.set_fixed_step_values(step)
+            self.arduino_controller.set_input_source(
+                step.input_source, self.active_test.input_type
+            ).add_done_callback(lambda future: self.on_input_source_set(future, step))
+            return
+
+        if self.state is not TestState.CANCELED:
+            self.state = (
+                TestState.PASSED
+                if False not in self.test_sequence_status
+                else TestState.FAILED
+            )
+            self.record_run()
+        self.notify(SequenceEvent.SEQUENCE_FINISHED, self.test_result_data)
+        self.notify(SequenceEvent.STATE_CHANGED, "")
+        self.reset()
+
+    def start_capture(self, capture_path: str, serial_number: str) -> None:
+        channel_ids = self.get_active_channel_ids()
+        self.waveform_writer = WaveformWriter(capture_path, serial_number, channel_ids)
+        self.capture_markers = {
+            channel_id: self.instrument_worker.telemetry[channel_id].mark()
+            for channel_id in channel_ids
+        }
+        self.capture_step = 0
+
+    def capture_samples(self) -> None:
+        """
+        Writes the samples read since the last call to the waveform file, tagged
+        with the test file index of the running step.
+        """
+        if self.waveform_writer is None:
+            return
+        for channel_id, marker in self.capture_markers.items():
+            telemetry = self.instrument_worker.telemetry[channel_id]
+            count = telemetry.mark()
+            self.waveform_writer.append(
+                self.capture_step, channel_id, telemetry.since(marker)
+            )
+            self.capture_markers[channel_id] = count
+
+    def stop_capture(self) -> None:
+        if self.waveform_writer is None:
+            return
+        self.capture_samples()
+        self.waveform_writer.close()
+        self.waveform_writer = None
+        self.capture_markers = {}
+
+    def record_run(self) -> None:
+        if self.results_database is None:
+            return
+        try:
+            self.results_database.record(
+                self.test_result_data, self.state, self.is_single_step
+            )
+        except ResultsDatabaseError as e:
+            self.notify(SequenceEvent.RECORD_FAILED, str(e))
+
+    def on_input_source_set(self, future: Future, step: Step) -> None:
+        # Runs on the Arduino worker thread, the host hands the step back.
+        if future.exception() is not None:
+            self.notify(SequenceEvent.ERROR, f"Arduino: {future.exception()}")
+            return
+        self.notify(SequenceEvent.INPUT_SOURCE_READY, step)
+
+    def start_step(self, step: Step) -> None:
+        if self.state is TestState.CANCELED:
+            return
+        match step.step_type:
+            case 1:
+                self.cc_test_mode(step)
+            case 2:
+                self.cl_test_mode(step)
+            case 3:
+                self.short_test_mode(step)
+
+    def set_fixed_step_values(self, step: Step) -> None:
+        self.limits.update(step.channels_configuration)
+        self.notify(SequenceEvent.LIMITS_CHANGED, step)
+
+    def cc_test_mode(self, step: Step) -> None:
+        for channel_id, params in step.channels_configuration.items():
+            self.update_current_load(channel_id, params.static_load)
+        # The statistics window opens once the instrument applied the loads.
+        self.instrument_worker.submit(self.sat_controller.wait_complete)
+        self.instrument_worker.submit(
+            self.instrument_worker.start_step_statistics,
+            {
+                channel_id: (params.voltage_lower or 0.0, params.voltage_upper or 0.0)
+                for channel_id, params in self.limits.items()
+            },
+            SETTLE_TIME,
+        )
+        if step.duration == 0:
+            self.set_state(TestState.WAITKEY, step.description)
+        else:
+            if step.settle_window > 0:
+                self.settle_step = step
+                self.settle_start = monotonic()
+                self.settle_markers = {
+                    channel_id: self.instrument_worker.telemetry[channel_id].mark()
+                    for channel_id in step.channels_configuration
+                }
+            self.timer.start_delay(step.duration * 1000)
+
+    def check_step_settled(self) -> None:
+        """
+        Completes the running CC step early once every configured channel stayed
+        inside its voltage band, with a variance below settle_variance, for the
+        last settle_window seconds.
+        """
+        step = self.settle_step
+        now = monotonic()
+        if now - self.settle_start < SETTLE_TIME + step.settle_window:
+            return
+        for channel_id, params in step.channels_configuration.items():
+            samples = self.instrument_worker.telemetry[channel_id].since(
+                self.settle_markers[channel_id]
+            )
+            start = np.searchsorted(samples["timestamp"], now - step.settle_window)
+            voltages = samples["voltage"][start:]
+            if (
+                len(voltages) < 2
+                or voltages.min() < (params.voltage_lower or 0.0)
+                or voltages.max() > (params.voltage_upper or 0.0)
+                or voltages.var() > step.settle_variance
+            ):
+                return
+        self.timer.stop()
+        self.on_delay_completed()
+
+    def cl_test_mode(self, step: Step) -> None:
+        now = monotonic()
+        self.channel_tests_step = step
+        self.channel_tests = [
+            CurrentLimitRamp(channel_id, params, self.set_probe_load, now)
+            for channel_id, params in step.channels_configuration.items()
+        ]
+
+    def short_test_mode(self, step: Step) -> None:
+        now = monotonic()
+        self.channel_tests_step = step
+        # Shutdown and recovery take milliseconds, the shorted channels are read
+        # in burst and every sample is fed to the test with its own timestamp.
+        for channel_id in step.channels_configuration:
+            self.monitor.set_sample_period(channel_id, BURST_SAMPLE_PERIOD)
+            self.burst_markers[channel_id] = self.instrument_worker.telemetry[
+                channel_id
+            ].mark()
+        self.channel_tests = [
+            ShortCircuitTest(
+                channel_id,
+                params,
+                self.toggle_short_mode,
+                self.update_current_load,
+                now,
+            )
+            for channel_id, params in step.channels_configuration.items()
+        ]
+        # Also times out the channels that stop returning samples.
+        self.timer.start_delay(SHORT_TIMEOUT * 1000)
+
+    def advance_channel_tests(self) -> None:
+        """
+        Feeds the latest sample of each channel to its CL or short state machine,
+        or every new sample for channels read in burst. All channels of the step
+        run concurrently, the step is validated once every state machine is done.
+        """
+        now = monotonic()
+        for test in self.channel_tests:
+            if test.channel_id in self.burst_markers:
+                telemetry = self.instrument_worker.telemetry[test.channel_id]
+                count = telemetry.mark()
+                samples = telemetry.latest(
+                    count - self.burst_markers[test.channel_id], count
+                )
+                self.burst_markers[test.channel_id] = count
+                for sample in samples:
+                    test.update(
+                        float(sample["voltage"]),
+                        float(sample["current"]),
+                        float(sample["timestamp"]),
+                    )
+                continue
+            reading = self.readings[test.channel_id]
+            test.update(reading.voltage, reading.current, now)
+        if not all(test.done for test in self.channel_tests):
+            return
+        self.timer.stop()
+        self.stop_burst_sampling()
+
+        match self.channel_tests_step.step_type:
+            case 2:
+                self.validate_cl_step_values()
+            case 3:
+                self.validate_short_step_values()
+        self.channel_tests = []
+        self.channel_tests_step = None
+        self.current_index += 1
+        self.run_steps()
+
+    def stop_burst_sampling(self) -> None:
+        for channel_id in self.burst_markers:
+            self.monitor.clear_sample_period(channel_id)
+        self.burst_markers = {}
+
+    def on_delay_completed(self) -> None:
+        self.settle_step = None
+        if self.channel_tests:
+            # Short circuit timeout, fails the channels still running.
+            for test in self.channel_tests:
+                if not test.done:
+                    test.finish()
+            self.advance_channel_tests()
+        elif self.state is not TestState.CANCELED:
+            self.validate_cc_step_values()
+            self.current_index += 1
+            self.run_steps()
+
+    def validate_cc_step_values(self) -> None:
+        step_pass = True
+        current_step_data = []
+        step_statistics = self.instrument_worker.finish_step_statistics()
+
+        for channel_id, params in self.limits.items():
+            reading = self.readings[channel_id]
+            voltage_lower = params.voltage_lower or 0.0
+            voltage_upper = params.voltage_upper or 0.0
+            channel_data = {
+                "channel_id": str(channel_id),
+                "voltage_output": reading.voltage,
+                "voltage_upper": voltage_upper,
+                "voltage_lower": voltage_lower,
+                "load": self.loads[channel_id],
+                "current": reading.current,
+                "power": reading.power,
+            }
+            statistics = step_statistics.get(channel_id)
+
+            if statistics is not None and statistics.count > 0:
+                channel_data.update(
+                    voltage_mean=statistics.mean,
+                    voltage_min=statistics.minimum,
+                    voltage_max=statistics.maximum,
+                    voltage_ripple=statistics.ripple,
+                    in_band=statistics.in_band_ratio * 100,
+                )
+                channel_pass = statistics.passed()
+            else:
+                # Step too short to collect samples, judge the last one.
+                channel_pass = voltage_lower <= reading.voltage <= voltage_upper
+                channel_data.update(
+                    voltage_mean=reading.voltage,
+                    voltage_min=reading.voltage,
+                    voltage_max=reading.voltage,
+                    voltage_ripple=0.0,
+                    in_band=100.0 if channel_pass else 0.0,
+                )
+
+            current_step_data.append(channel_data)
+            if not channel_pass:
+                step_pass = False
+
+        self.handle_test_data(tuple(current_step_data), step_pass)
+
+    def validate_cl_step_values(self) -> None:
+        step_pass = True
+        current_step_data = []
+
+        for test in self.channel_tests:
+            channel_data = {
+                "channel_id": str(test.channel_id),
+                "under_voltage": test.params.voltage_under_limit,
+                "load_upper": test.params.load_upper,
+                "load_lower": test.params.load_lower,
+                "load": test.peak_current,
+                "trip_load": test.trip_load,
+            }
+
+            current_step_data.append(channel_data)
+            if not test.passed():
+                step_pass = False
+
+        self.handle_test_data(tuple(current_step_data), step_pass)
+
+    def validate_short_step_values(self) -> None:
+        step_pass = True
+        current_step_data = []
+
+        for test in self.channel_tests:
+            channel_data = {
+                "channel_id": str(test.channel_id),
+                "voltage_ref": test.params.voltage_lower,
+                "shutdown": test.shutdown,
+                "recovery": test.recovery,
+                "shutdown_time": test.shutdown_time,
+                "recovery_time": test.recovery_time,
+                "load": test.params.static_load,
+            }
+
+            current_step_data.append(channel_data)
+            if not test.passed():
+                step_pass = False
+
+        self.handle_test_data(tuple(current_step_data), step_pass)
+
+    def handle_test_data(self, data: tuple, step_status: bool) -> None:
+        current_step = self.get_steps()[self.current_index]
+        step_data = {
+            "index": self.test_step_index(),
+            "description": current_step.description,
+            "status": step_status,
+            "type": current_step.step_type,
+            "channels": data,
+        }
+        self.test_sequence_status.append(step_status)
+        self.test_result_data["steps"].append(step_data)
+        self.notify(SequenceEvent.STEP_FINISHED, step_status)
+
+    def process_readings(self, readings: dict[int, ChannelReading]) -> None:
+        """
+        Receives the readings taken from instrument_worker and advances the
+        running step.
+        """
+        for channel_id, reading in readings.items():
+            if channel_id in self.readings:
+                self.readings[channel_id] = merge_readings(
+                    self.readings[channel_id], reading
+                )
+        self.capture_samples()
+        if self.state is not TestState.RUNNING:
+            return
+        if self.settle_step is not None:
+            self.check_step_settled()
+        if self.channel_tests:
+            self.advance_channel_tests()
+
+    def update_current_load(
+        self, channel_id: int, load: float, wait_complete: bool = False
+    ) -> None:
+        """
+        With wait_complete, the instrument thread waits on *OPC? after the write,
+        so every command and reading queued after it sees the load applied.
+        """
+        if channel_id not in self.loads:
+            return
+        self.loads[channel_id] = load
+        self.notify(SequenceEvent.LOAD_CHANGED, channel_id, load)
+        self.instrument_worker.submit(
+            self.sat_controller.set_channel_current, channel_id, load, wait_complete
+        )
+
+    def set_probe_load(self, channel_id: int, load: float) -> None:
+        self.update_current_load(channel_id, load, wait_complete=True)
+
+    def toggle_short_mode(
+        self,
+        channel_id: int,
+        state: bool,
+        on_switched: Callable[[float], None] | None = None,
+    ) -> None:
+        """
+        on_switched(timestamp) is called on the instrument thread once the
+        switch command was sent, see InstrumentWorker.submit_flushed().
+        """
+        if on_switched is None:
+            self.instrument_worker.submit(
+                self.sat_controller.toggle_short_mode, channel_id, state
+            )
+            return
+        self.instrument_worker.submit_flushed(
+            on_switched, self.sat_controller.toggle_short_mode, channel_id, state
+        )
+
+    def reset(self) -> None:
+        channel_ids = self.get_active_channel_ids()
+        self.instrument_worker.submit(
+            self.sat_controller.toggle_active_channels_input, channel_ids, False
+        )
+        self.arduino_controller.set_active_pin(True)
+        self.monitor.pause()
+        self.stop_capture()
+        self.timer.stop()
+        self.settle_step = None
+        self.channel_tests = []
+        self.channel_tests_step = None
+        self.stop_burst_sampling()
+        for channel_id in channel_ids:
+            self.toggle_short_mode(channel_id, False)
+        self.test_sequence_status.clear()
+        self.is_single_step = False
+        self.selected_step_index = -1
+        self.current_index = 0
+        self.arduino_controller.buzzer()
+        self.notify(SequenceEvent.STOPPED)
@@ -0,0 +1,60 @@
+from math import inf
+
+# Samples taken right after the step starts are skipped while the output settles.
+SETTLE_TIME = 0.5
+# Minimum fraction of samples inside the voltage band for a step to pass.
+MIN_IN_BAND_RATIO = 0.9
+
+
+class StepStatistics:
+    """
+    Running statistics of one channel's voltage over a step, updated per sample
+    (Welford's algorithm) so reading them at the end of the step is O(1).
+    Samples with a timestamp before start_time are ignored.
+    """
+
+    def __init__(self, lower: float, upper: float, start_time: float = 0.0):
+        self.lower = lower
+        self.upper = upper
+        self.start_time = start_time
+        self.count = 0
+        self.in_band = 0
+        self.minimum = inf
+        self.maximum = -inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float, timestamp: float) -> None:
+        if timestamp < self.start_time:
+            return
+        self.count += 1
+        if self.lower <= value <= self.upper:
+            self.in_band += 1
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def ripple(self) -> float:
+        return self.maximum - self.minimum if self.count else 0.0
+
+    @property
+    def in_band_ratio(self) -> float:
+        return self.in_band / self.count if self.count else 0.0
+
+    def passed(self) -> bool:
+        """
+        Returns true when the mean is inside the band and at least
+        MIN_IN_BAND_RATIO of the samples were.
+        """
+        return (
+            self.count > 0
+            and self.lower <= self.mean <= self.upper
+            and self.in_band_ratio >= MIN_IN_BAND_RATIO
+        )
@@ -0,0 +1,70 @@
+from time import monotonic
+from typing import Callable
+
+from utils.timing_stats import LatenessStats
+
+
+class StepTimer:
+    """
+    Counts a delay (in ms) down against a time.monotonic() deadline, without Qt.
+    The deadline is checked by poll(), which calls on_completed once it passed:
+    headless hosts poll it from their loop, DelayManager from a QTimer.
+    After each delay, overshoot holds how many ms it completed past its deadline,
+    overshoot_stats accumulates it (in seconds) until reset by the host.
+    wait_time accumulates the seconds spent counting delays down, paused time
+    excluded.
+    """
+
+    def __init__(self, on_completed: Callable[[], None]):
+        self.on_completed = on_completed
+        self.remaining_time = 0
+        self.paused = False
+        self.active = False
+        self.deadline = 0.0
+        self.overshoot = 0.0
+        self.overshoot_stats = LatenessStats()
+        self.wait_time = 0.0
+        self.wait_start = 0.0
+
+    def start_delay(self, delay):
+        self.remaining_time = delay
+        self.active = True
+        self.wait_start = monotonic()
+        self.deadline = self.wait_start + delay / 1000
+
+    def pause_resume(self):
+        if self.paused:
+            self.paused = False
+            if not self.active:
+                return
+            self.wait_start = monotonic()
+            self.deadline = self.wait_start + self.remaining_time / 1000
+        else:
+            self.paused = True
+            self.remaining_time = max(0, int((self.deadline - monotonic()) * 1000))
+            if self.active:
+                self.wait_time += monotonic() - self.wait_start
+
+    def stop(self):
+        if self.active and not self.paused:
+            self.wait_time += monotonic() - self.wait_start
+        self.paused = False
+        self.active = False
+        self.remaining_time = 0
+
+    def remaining(self) -> float:
+        """
+        Returns the ms left until the deadline, negative once it passed.
+        """
+        return (self.deadline - monotonic()) * 1000
+
+    def poll(self) -> None:
+        now = monotonic()
+        if not self.active or self.paused or now < self.deadline:
+            return
+        self.overshoot = (now - self.deadline) * 1000
+        self.overshoot_stats.add(now - self.deadline)
+        self.wait_time += now - self.wait_start
+        self.active = False
+        self.remaining_time = 0
+        self.on_completed()
@@ -0,0 +1,76 @@
+from time import monotonic
+
+import numpy as np
+
+# One acquisition sample, current and power are NaN when they were not fetched.
+TELEMETRY_DTYPE = np.dtype(
+    [
+        ("timestamp", "f8"),
+        ("voltage", "f4"),
+        ("current", "f4"),
+        ("power", "f4"),
+    ]
+)
+# About 55 minutes of samples at 20 Hz.
+DEFAULT_CAPACITY = 65536
+
+
+class TelemetryBuffer:
+    """
+    Fixed capacity ring buffer of one channel's samples.
+    Every sample is stored twice, at index and index + capacity, so the last
+    capacity samples are always contiguous and every read is a zero-copy view.
+    Views stay valid until the buffer wraps over them, copy them to keep them.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.samples = np.full(2 * capacity, np.nan, dtype=TELEMETRY_DTYPE)
+        self.count = 0
+
+    def append(
+        self,
+        voltage: float,
+        current: float | None = None,
+        power: float | None = None,
+        timestamp: float | None = None,
+    ) -> None:
+        sample = (
+            monotonic() if timestamp is None else timestamp,
+            voltage,
+            np.nan if current is None else current,
+            np.nan if power is None else power,
+        )
+        index = self.count % self.capacity
+        self.samples[index] = sample
+        self.samples[index + self.capacity] = sample
+        # Published last, readers never see a half written sample.
+        self.count += 1
+
+    def mark(self) -> int:
+        """
+        Returns a marker of the current position, to read the samples appended
+        after it with since().
+        """
+        return self.count
+
+    def since(self, marker: int) -> np.ndarray:
+        """
+        Returns a view of the samples appended after marker, limited to the last
+        capacity samples.
+        """
+        count = self.count
+        return self.latest(count - marker, count)
+
+    def latest(self, length: int, count: int | None = None) -> np.ndarray:
+        """
+        Returns a view of the last length samples (at most capacity).
+        """
+        count = self.count if count is None else count
+        length = max(0, min(length, count, self.capacity))
+        # Ending at the upper copy of the last sample keeps the window contiguous.
+        end = (count - 1) % self.capacity + 1 + self.capacity
+        return self.samples[end - length : end]
+
+    def clear(self) -> None:
+        self.count = 0
@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class LatenessStats:
+    """
+    Count, mean and maximum of how late a series of events happened, in seconds.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, lateness: float) -> None:
+        self.count += 1
+        self.total += lateness
+        self.max = max(self.max, lateness)
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
@@ -0,0 +1,125 @@
+import os
+from dataclasses import dataclass
+from time import monotonic, time
+
+import numpy as np
+
+WAVEFORM_EXTENSION = ".wfm"
+WAVEFORM_MAGIC = b"IT87WAVE"
+WAVEFORM_VERSION = 1
+MAX_CHANNELS = 16
+# The header is padded to HEADER_SIZE so the records stay 8 byte aligned.
+HEADER_SIZE = 128
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u2"),
+        ("channel_count", "<u2"),
+        ("record_size", "<u4"),
+        ("start_time", "<f8"),
+        ("serial_number", "S16"),
+        ("channel_ids", "<u2", (MAX_CHANNELS,)),
+    ]
+)
+# One acquisition sample: seconds since the capture start, index of the test step
+# and of the channel in the header channel map. Current and power are NaN when
+# they were not fetched, as in TELEMETRY_DTYPE.
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("step", "<u2"),
+        ("channel", "<u2"),
+        ("voltage", "<f4"),
+        ("current", "<f4"),
+        ("power", "<f4"),
+    ]
+)
+
+
+class WaveformWriter:
+    """
+    Streams the acquisition samples of a unit to a waveform file: a HEADER_SIZE
+    header with the channel map followed by RECORD_DTYPE records.
+    The file is written as file_path.part and renamed to file_path on close().
+    """
+
+    def __init__(self, file_path: str, serial_number: str, channel_ids: list[int]):
+        if len(channel_ids) > MAX_CHANNELS:
+            raise ValueError(f"At most {MAX_CHANNELS} channels can be captured")
+        self.file_path = file_path
+        self.temp_path = file_path + ".part"
+        self.channel_index = {
+            channel_id: index for index, channel_id in enumerate(channel_ids)
+        }
+        # Samples carry monotonic() timestamps, records are relative to
+        # start_monotonic and the header maps it to the date.
+        self.start_time = time()
+        self.start_monotonic = monotonic()
+        header = np.zeros((), HEADER_DTYPE)
+        header["magic"] = WAVEFORM_MAGIC
+        header["version"] = WAVEFORM_VERSION
+        header["channel_count"] = len(channel_ids)
+        header["record_size"] = RECORD_DTYPE.itemsize
+        header["start_time"] = self.start_time
+        header["serial_number"] = serial_number.encode()
+        header["channel_ids"][: len(channel_ids)] = channel_ids
+        self.file = open(self.temp_path, "wb")
+        self.file.write(header.tobytes().ljust(HEADER_SIZE, b"\0"))
+
+    def append(self, step_index: int, channel_id: int, samples: np.ndarray) -> None:
+        """
+        Writes samples (TELEMETRY_DTYPE) of channel_id taken during step_index.
+        """
+        if not len(samples):
+            return
+        records = np.empty(len(samples), RECORD_DTYPE)
+        records["timestamp"] = samples["timestamp"] - self.start_monotonic
+        records["step"] = step_index
+        records["channel"] = self.channel_index[channel_id]
+        for name in ("voltage", "current", "power"):
+            records[name] = samples[name]
+        self.file.write(records.tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+        os.replace(self.temp_path, self.file_path)
+
+
+@dataclass
+class Waveform:
+    serial_number: str
+    start_time: float
+    channel_ids: list[int]
+    records: np.ndarray
+
+    def channel(self, channel_id: int, step_index: int | None = None) -> np.ndarray:
+        """
+        Returns the records of channel_id, only those of step_index when given.
+        """
+        selected = self.records["channel"] == self.channel_ids.index(channel_id)
+        if step_index is not None:
+            selected &= self.records["step"] == step_index
+        return self.records[selected]
+
+
+def load_waveform(file_path: str) -> Waveform:
+    """
+    Reads the waveform file at file_path, its records are memory-mapped and only
+    read from the disk when accessed.
+    """
+    header = np.fromfile(file_path, HEADER_DTYPE, count=1)[0]
+    if header["magic"] != WAVEFORM_MAGIC or header["version"] != WAVEFORM_VERSION:
+        raise ValueError(f"{file_path} is not a version {WAVEFORM_VERSION} waveform")
+    # An interrupted capture may end with a partial record, it is left out.
+    count = (os.path.getsize(file_path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    records = (
+        np.memmap(file_path, RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        if count
+        else np.empty(0, RECORD_DTYPE)
+    )
+    return Waveform(
+        serial_number=header["serial_number"].decode(),
+        start_time=float(header["start_time"]),
+        channel_ids=[int(c) for c in header["channel_ids"][: header["channel_count"]]],
+        records=records,
+    )
@@ -0,0 +1,246 @@
+import sqlite3
+from dataclasses import dataclass, field
+from threading import Lock
+
+import numpy as np
+
+from utils.results_database import DEFAULT_DATABASE_PATH
+
+# Channel voltages analysed for capability: the mean of every CC step, against
+# the band of the step.
+VOLTAGE_STEP_TYPE = 1
+VOLTAGE_NAMES = ("voltage_mean", "voltage_lower", "voltage_upper")
+
+# Production runs of a model within [start, end), later than a run id. Canceled
+# and single step runs are left out of every statistic.
+RUNS_FILTER = """
+    r.id > ? AND r.model = ? AND r.timestamp >= ? AND r.timestamp < ?
+    AND r.single_step = 0 AND r.status != 'CANCELED'
+"""
+
+
+@dataclass
+class ResultsSlice:
+    """
+    Runs of a model within a date range, as arrays ordered by run id.
+    The database is append-only, so refreshing only appends the runs later than
+    last_run_id.
+    """
+
+    last_run_id: int = 0
+    serials: np.ndarray = field(default_factory=lambda: np.empty(0, str))
+    passed: np.ndarray = field(default_factory=lambda: np.empty(0, bool))
+    failed_steps: np.ndarray = field(default_factory=lambda: np.empty(0, str))
+    step_indexes: np.ndarray = field(default_factory=lambda: np.empty(0, int))
+    descriptions: np.ndarray = field(default_factory=lambda: np.empty(0, str))
+    channel_ids: np.ndarray = field(default_factory=lambda: np.empty(0, int))
+    voltages: np.ndarray = field(default_factory=lambda: np.empty((0, 3)))
+
+
+@dataclass
+class Capability:
+    step_index: int
+    description: str
+    channel_id: int
+    count: int
+    mean: float
+    std: float
+    lower: float
+    upper: float
+    cpk: float
+
+
+@dataclass
+class ParetoEntry:
+    description: str
+    count: int
+    percent: float
+    cumulative: float
+
+
+@dataclass
+class YieldSummary:
+    runs: int
+    units: int
+    first_pass_yield: float
+    capability: list[Capability]
+    pareto: list[ParetoEntry]
+
+
+class ResultsQuery:
+    """
+    Yield and SPC statistics of the ResultsDatabase at path, per model and date
+    range (epoch seconds, end excluded, None for open).
+    The loaded runs are cached per (model, start, end) and refreshed
+    incrementally, every statistic is computed with numpy over the cache.
+    Safe to call from a worker thread, each call opens its own connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_DATABASE_PATH):
+        self.path = path
+        self.slices: dict[tuple, ResultsSlice] = {}
+        self.lock = Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def models(self) -> list[str]:
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT DISTINCT model FROM runs WHERE model IS NOT NULL ORDER BY model"
+            ).fetchall()
+        return [model for (model,) in rows]
+
+    def load(
+        self, model: str, start: float | None = None, end: float | None = None
+    ) -> ResultsSlice:
+        """
+        Returns the cached slice of model within [start, end), with the runs
+        recorded since the last call appended.
+        """
+        key = (model, start, end)
+        with self.lock:
+            results = self.slices.setdefault(key, ResultsSlice())
+            params = (
+                results.last_run_id,
+                model,
+                -np.inf if start is None else start,
+                np.inf if end is None else end,
+            )
+            with self.connect() as connection:
+                append_runs(connection, results, params)
+            return results
+
+    def summary(
+        self, model: str, start: float | None = None, end: float | None = None
+    ) -> YieldSummary:
+        results = self.load(model, start, end)
+        units, yield_ = first_pass_yield(results.serials, results.passed)
+        return YieldSummary(
+            runs=len(results.passed),
+            units=units,
+            first_pass_yield=yield_,
+            capability=capability(results),
+            pareto=failure_pareto(results.failed_steps),
+        )
+
+
+def append_runs(connection: sqlite3.Connection, results: ResultsSlice, params):
+    runs = connection.execute(
+        f"SELECT r.id, r.serial_number, r.status = 'PASSED' FROM runs r"
+        f" WHERE {RUNS_FILTER} ORDER BY r.id",
+        params,
+    ).fetchall()
+    if not runs:
+        return
+    last_run_id = runs[-1][0]
+    # Bounded by last_run_id, runs recorded meanwhile wait for the next refresh.
+    params = (*params, last_run_id)
+    failed_steps = connection.execute(
+        f"SELECT s.description FROM runs r JOIN steps s ON s.run_id = r.id"
+        f" WHERE {RUNS_FILTER} AND r.id <= ? AND s.status = 0 ORDER BY r.id",
+        params,
+    ).fetchall()
+    voltages = connection.execute(
+        f"SELECT s.step_index, s.description, m.channel_id,"
+        f" MAX(CASE WHEN m.name = ? THEN m.value END),"
+        f" MAX(CASE WHEN m.name = ? THEN m.value END),"
+        f" MAX(CASE WHEN m.name = ? THEN m.value END)"
+        f" FROM runs r JOIN steps s ON s.run_id = r.id"
+        f" JOIN measurements m ON m.step_id = s.id"
+        f" WHERE {RUNS_FILTER} AND r.id <= ? AND s.step_type = ?"
+        f" AND m.name IN (?, ?, ?)"
+        f" GROUP BY m.step_id, m.channel_id ORDER BY r.id",
+        (*VOLTAGE_NAMES, *params, VOLTAGE_STEP_TYPE, *VOLTAGE_NAMES),
+    ).fetchall()
+
+    _, serials, passed = zip(*runs)
+    results.serials = np.concatenate((results.serials, np.array(serials, str)))
+    results.passed = np.concatenate((results.passed, np.array(passed, bool)))
+    results.failed_steps = np.concatenate(
+        (results.failed_steps, np.array([row[0] for row in failed_steps], str))
+    )
+    if voltages:
+        step_indexes, descriptions, channel_ids, *values = zip(*voltages)
+        results.step_indexes = np.concatenate(
+            (results.step_indexes, np.array(step_indexes, int))
+        )
+        results.descriptions = np.concatenate(
+            (results.descriptions, np.array(descriptions, str))
+        )
+        results.channel_ids = np.concatenate(
+            (results.channel_ids, np.array(channel_ids, int))
+        )
+        results.voltages = np.concatenate((results.voltages, np.array(values, float).T))
+    results.last_run_id = last_run_id
+
+
+def first_pass_yield(serials: np.ndarray, passed: np.ndarray) -> tuple[int, float]:
+    """
+    Returns the number of units and the fraction of them that passed their
+    first run (within the slice), serials ordered by run.
+    """
+    if not len(serials):
+        return 0, float("nan")
+    _, first_runs = np.unique(serials, return_index=True)
+    return len(first_runs), float(passed[first_runs].mean())
+
+
+def capability(results: ResultsSlice) -> list[Capability]:
+    """
+    Returns the Cpk of the voltage of every (step, channel, band), with the
+    sample standard deviation: min(upper - mean, mean - lower) / (3 * std).
+    """
+    value, lower, upper = results.voltages.T
+    valid = ~(np.isnan(value) | np.isnan(lower) | np.isnan(upper))
+    columns = (
+        results.step_indexes[valid],
+        results.channel_ids[valid],
+        lower[valid],
+        upper[valid],
+    )
+    value = value[valid]
+    # Groups by one integer key, unique() over records is an order slower.
+    uniques, codes = zip(*(np.unique(c, return_inverse=True) for c in columns))
+    keys = np.ravel_multi_index(codes, [len(u) for u in uniques])
+    _, first, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True
+    )
+    step_indexes, channel_ids, lowers, uppers = (c[first] for c in columns)
+    means = np.bincount(inverse, value) / counts
+    deviations = value - means[inverse]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stds = np.sqrt(np.bincount(inverse, deviations**2) / (counts - 1))
+        cpks = np.minimum(uppers - means, means - lowers) / (3 * stds)
+    descriptions = results.descriptions[valid][first]
+    return [
+        Capability(int(step), str(desc), int(ch), int(n), *map(float, rest))
+        for step, desc, ch, n, *rest in zip(
+            step_indexes,
+            descriptions,
+            channel_ids,
+            counts,
+            means,
+            stds,
+            lowers,
+            uppers,
+            cpks,
+        )
+    ]
+
+
+def failure_pareto(failed_steps: np.ndarray) -> list[ParetoEntry]:
+    """
+    Returns the failed steps by descending number of failures, with their share
+    of all failures and the cumulative share.
+    """
+    descriptions, counts = np.unique(failed_steps, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    descriptions, counts = descriptions[order], counts[order]
+    percents = 100 * counts / max(counts.sum(), 1)
+    return [
+        ParetoEntry(str(description), int(count), float(percent), float(cumulative))
+        for description, count, percent, cumulative in zip(
+            descriptions, counts, percents, np.cumsum(percents)
+        )
+    ]
@@ -9,9 +9,12 @@ from PySide6.QtWidgets import (
     QGroupBox,
 )
 
+from controllers.sat_controller import ChannelReading
+
 
 class Data:
     voltage_output: float = 0
+    current_output: float = 0
     voltage_upper: float = 0
     voltage_lower: float = 0
     load: float = 0
@@ -33,6 +36,8 @@ class ChannelMonitor(QGroupBox):
         self.channel_description_label = custom_label(self.channel_label, 14, 500)
         self.voltage_value_label = custom_label("0.00 V", 36, 700)
         self.load_value_label = custom_label("0.00 A", 36, 700)
+        # Set point above, measured current below it.
+        self.current_value_label = custom_label("Medida: 0.00 A", 12, 400)
         self.step_info_label = custom_label(
             "V (0.00 ~ 0.00)  |  A (0.00 ~ 0.00)  |  Potência: 0.00W", 12, 400
         )
@@ -51,7 +56,13 @@ class ChannelMonitor(QGroupBox):
             self.voltage_value_label, 0, Qt.AlignmentFlag.AlignLeft
         )
         h_values_layout.addWidget(separator)
-        h_values_layout.addWidget(self.load_value_label, 0, Qt.AlignmentFlag.AlignRight)
+        v_load_layout = QVBoxLayout()
+        v_load_layout.setSpacing(0)
+        v_load_layout.addWidget(self.load_value_label, 0, Qt.AlignmentFlag.AlignRight)
+        v_load_layout.addWidget(
+            self.current_value_label, 0, Qt.AlignmentFlag.AlignRight
+        )
+        h_values_layout.addLayout(v_load_layout)
         values_frame = QFrame()
         # values_frame.setFrameShape(QFrame.StyledPanel)
         values_frame.setFrameShape(QFrame.Shape.StyledPanel)
@@ -86,13 +97,25 @@ class ChannelMonitor(QGroupBox):
         self.data.load = float(value)
         self.load_value_label.setText(f'{"%.2f" % self.data.load} A')
 
+    def update_readings(self, reading: ChannelReading):
+        self.update_voltage_value(reading.voltage)
+        if reading.current is not None:
+            self.update_current_value(reading.current)
+        if reading.power is not None:
+            self.update_power_value(reading.power)
+
     def update_voltage_value(self, value):
         self.data.voltage_output = float(value)
         self.voltage_value_label.setText(f'{"%.2f" % self.data.voltage_output} V')
-        self.update_power_value()
 
-    def update_power_value(self):
-        self.data.power = self.data.load * self.data.voltage_output
+    def update_current_value(self, value):
+        self.data.current_output = float(value)
+        self.current_value_label.setText(
+            f'Medida: {"%.2f" % self.data.current_output} A'
+        )
+
+    def update_power_value(self, value):
+        self.data.power = float(value)
         self.set_info_label_values()
 
 
@@ -620,6 +620,10 @@ class ParamDetailsDialog(QDialog):
         self.load_upper_sb = custom_spinbox("A")
         self.load_lower_sb = custom_spinbox("A")
         self.load_increase_step_sb = custom_spinbox("A")
+        self.search_mode_cb = QComboBox()
+        self.search_mode_cb.addItems(["Linear", "Bisseção"])
+        self.search_resolution_sb = custom_spinbox("A")
+        self.search_resolution_sb.setDecimals(3)
 
         buttons = (
             QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
@@ -644,6 +648,8 @@ class ParamDetailsDialog(QDialog):
         load_layout.addRow("Minima", self.load_lower_sb)
         load_layout.addRow("Limite Superior", self.end_load_sb)
         load_layout.addRow("Incremento", self.load_increase_step_sb)
+        load_layout.addRow("Busca", self.search_mode_cb)
+        load_layout.addRow("Resolução", self.search_resolution_sb)
 
         voltage_gb.setLayout(voltage_layout)
         load_gb.setLayout(load_layout)
@@ -669,6 +675,12 @@ class ParamDetailsDialog(QDialog):
         self.load_lower_sb.setValue(self.old_data.get("load_lower"))
         self.end_load_sb.setValue(self.old_data.get("end_load"))
         self.load_increase_step_sb.setValue(self.old_data.get("increase_step"))
+        self.search_mode_cb.setCurrentIndex(
+            1 if self.old_data.get("search_mode") == "bisection" else 0
+        )
+        self.search_resolution_sb.setValue(
+            self.old_data.get("search_resolution") or 0.0
+        )
 
     def get_old_data(self):
         return self.old_data
@@ -684,6 +696,10 @@ class ParamDetailsDialog(QDialog):
             "load_upper": self.load_upper_sb.value(),
             "load_lower": self.load_lower_sb.value(),
             "increase_step": self.load_increase_step_sb.value(),
+            "search_mode": (
+                "bisection" if self.search_mode_cb.currentIndex() == 1 else "linear"
+            ),
+            "search_resolution": self.search_resolution_sb.value() or None,
         }
 
 
@@ -707,6 +723,15 @@ class StepDetailsDialog(QDialog):
         self.duration_sb.setMinimum(0)
         self.duration_sb.setMaximum(60)
         self.duration_sb.setSuffix("s")
+        self.settle_window_sb = QDoubleSpinBox()
+        self.settle_window_sb.setMinimum(0)
+        self.settle_window_sb.setMaximum(60)
+        self.settle_window_sb.setSuffix("s")
+        self.settle_variance_sb = QDoubleSpinBox()
+        self.settle_variance_sb.setDecimals(4)
+        self.settle_variance_sb.setMinimum(0)
+        self.settle_variance_sb.setMaximum(10)
+        self.settle_variance_sb.setSuffix("V²")
         self.type_cb = QComboBox()
         self.type_cb.addItems(
             ["Corrente Continua", "Limitação de Corrente", "Curto Automático"]
@@ -743,6 +768,8 @@ class StepDetailsDialog(QDialog):
         layout.addRow("Descrição", self.description_field)
         layout.addRow("Tipo", self.type_cb)
         layout.addRow("Duração (s)", self.duration_sb)
+        layout.addRow("Estabilização (s)", self.settle_window_sb)
+        layout.addRow("Variância Máxima", self.settle_variance_sb)
         layout.addRow("Entrada", self.inputs_cb)
 
         if self.is_edit:
@@ -766,14 +793,21 @@ class StepDetailsDialog(QDialog):
         if self.type_cb.currentIndex() != 0:
             self.duration_sb.setValue(0)
             self.duration_sb.setReadOnly(True)
+            self.settle_window_sb.setValue(0)
+            self.settle_window_sb.setReadOnly(True)
+            self.settle_variance_sb.setReadOnly(True)
         else:
             self.duration_sb.setReadOnly(False)
+            self.settle_window_sb.setReadOnly(False)
+            self.settle_variance_sb.setReadOnly(False)
 
     def set_values(self):
         self.old_data = TestSetup.pop_step(self.edit_index)
         self.type_cb.setCurrentIndex(self.old_data.get("step_type") - 1)
         self.description_field.setText(self.old_data.get("description"))
         self.duration_sb.setValue(self.old_data.get("duration"))
+        self.settle_window_sb.setValue(self.old_data.get("settle_window", 0.0))
+        self.settle_variance_sb.setValue(self.old_data.get("settle_variance", 0.0))
         self.inputs_cb.setCurrentIndex(self.old_data.get("input_source") - 1)
         for channel in self.old_data.get("channels_configuration"):
             match channel["channel_id"]:
@@ -809,6 +843,8 @@ class StepDetailsDialog(QDialog):
             "step_type": self.type_cb.currentIndex() + 1,
             "description": self.description_field.text(),
             "duration": self.duration_sb.value(),
+            "settle_window": self.settle_window_sb.value(),
+            "settle_variance": self.settle_variance_sb.value(),
             "input_source": self.inputs_cb.currentIndex() + 1,
             "channels_configuration": channels_config,
         }
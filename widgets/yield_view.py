@@ -0,0 +1,208 @@
+from datetime import datetime, time, timedelta
+
+from PySide6.QtCore import QDate, QObject, QRunnable, QSize, Qt, QThreadPool, Signal
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDateEdit,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from utils.yield_statistics import ResultsQuery, YieldSummary
+
+CAPABILITY_COLUMNS = ["Etapa", "Canal", "N", "Média", "Desvio", "LIE", "LSE", "Cpk"]
+PARETO_COLUMNS = ["Etapa", "Falhas", "%", "% Acum."]
+# Cpk below which a channel is highlighted.
+MIN_CPK = 1.33
+DEFAULT_DAYS = 30
+
+
+class QuerySignals(QObject):
+    finished = Signal(object)
+    failed = Signal(str)
+
+
+class QueryWorker(QRunnable):
+    """
+    Runs query(*args) on the thread pool, so the window stays responsive while
+    the statistics of a large database are loaded.
+    """
+
+    def __init__(self, signals: QuerySignals, query, *args):
+        super().__init__()
+        self.signals = signals
+        self.query = query
+        self.args = args
+
+    def run(self):
+        try:
+            result = self.query(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+def read_only_table(columns: list[str]) -> QTableWidget:
+    table = QTableWidget(0, len(columns))
+    table.setFont(QFont("Arial", 12))
+    table.setHorizontalHeaderLabels(columns)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+    table.horizontalHeader().setStretchLastSection(True)
+    return table
+
+
+def fill_table(table: QTableWidget, rows: list[list[str]]) -> None:
+    table.setRowCount(len(rows))
+    for row, values in enumerate(rows):
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            if column:
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            table.setItem(row, column, item)
+
+
+class YieldView(QWidget):
+    """
+    First pass yield, voltage Cpk per channel and failure Pareto of a model
+    within a date range, from the results database.
+    """
+
+    def __init__(self, query: ResultsQuery):
+        super().__init__()
+        self.query = query
+        self.thread_pool = QThreadPool.globalInstance()
+        self.signals = QuerySignals()
+        self.signals.finished.connect(self.on_query_finished)
+        self.signals.failed.connect(self.on_query_failed)
+
+        self.setWindowTitle("CEBRA - Rendimento e CEP")
+        self.setMinimumSize(QSize(900, 600))
+
+        # Filters
+        self.model_cb = QComboBox()
+        self.model_cb.setMinimumWidth(250)
+        self.start_date = QDateEdit(QDate.currentDate().addDays(-DEFAULT_DAYS))
+        self.end_date = QDateEdit(QDate.currentDate())
+        for date_edit in (self.start_date, self.end_date):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd/MM/yyyy")
+        self.refresh_button = QPushButton("Atualizar")
+        self.refresh_button.clicked.connect(self.refresh)
+
+        filters_layout = QHBoxLayout()
+        filters_layout.addWidget(QLabel("Modelo:"))
+        filters_layout.addWidget(self.model_cb)
+        filters_layout.addWidget(QLabel("De:"))
+        filters_layout.addWidget(self.start_date)
+        filters_layout.addWidget(QLabel("Até:"))
+        filters_layout.addWidget(self.end_date)
+        filters_layout.addWidget(self.refresh_button)
+        filters_layout.addStretch()
+
+        # Results
+        self.yield_label = QLabel("---")
+        self.yield_label.setFont(QFont("Arial", 16, 600))
+        self.capability_table = read_only_table(CAPABILITY_COLUMNS)
+        self.pareto_table = read_only_table(PARETO_COLUMNS)
+
+        layout = QVBoxLayout()
+        layout.addLayout(filters_layout)
+        layout.addWidget(self.yield_label)
+        layout.addWidget(QLabel("Capacidade (tensão média das etapas CC)"))
+        layout.addWidget(self.capability_table)
+        layout.addWidget(QLabel("Pareto de falhas"))
+        layout.addWidget(self.pareto_table)
+        self.setLayout(layout)
+
+    def show(self) -> None:
+        super().show()
+        self.start_query(self.query.models)
+
+    def refresh(self) -> None:
+        model = self.model_cb.currentText()
+        if not model:
+            self.start_query(self.query.models)
+            return
+        start = datetime.combine(self.start_date.date().toPython(), time())
+        end = datetime.combine(self.end_date.date().toPython(), time())
+        self.start_query(
+            self.query.summary,
+            model,
+            start.timestamp(),
+            (end + timedelta(days=1)).timestamp(),
+        )
+
+    def start_query(self, query, *args) -> None:
+        self.refresh_button.setEnabled(False)
+        self.yield_label.setText("Carregando...")
+        self.thread_pool.start(QueryWorker(self.signals, query, *args))
+
+    def on_query_finished(self, result) -> None:
+        self.refresh_button.setEnabled(True)
+        if isinstance(result, YieldSummary):
+            self.update_summary(result)
+            return
+        # Model list
+        current_model = self.model_cb.currentText()
+        self.model_cb.clear()
+        self.model_cb.addItems(result)
+        if current_model in result:
+            self.model_cb.setCurrentText(current_model)
+        if result:
+            self.refresh()
+        else:
+            self.yield_label.setText("Nenhum resultado registrado")
+
+    def on_query_failed(self, message: str) -> None:
+        self.refresh_button.setEnabled(True)
+        self.yield_label.setText(f"Falha na consulta: {message}")
+
+    def update_summary(self, summary: YieldSummary) -> None:
+        if not summary.units:
+            self.yield_label.setText("Nenhum resultado no período")
+        else:
+            self.yield_label.setText(
+                f"Rendimento de primeira passagem: {summary.first_pass_yield:.1%}"
+                f"  ({summary.units} unidades, {summary.runs} testes)"
+            )
+        fill_table(
+            self.capability_table,
+            [
+                [
+                    f"{c.step_index + 1} - {c.description}",
+                    str(c.channel_id),
+                    str(c.count),
+                    f"{c.mean:.3f}",
+                    f"{c.std:.4f}",
+                    f"{c.lower:.2f}",
+                    f"{c.upper:.2f}",
+                    f"{c.cpk:.2f}",
+                ]
+                for c in summary.capability
+            ],
+        )
+        for row, c in enumerate(summary.capability):
+            if not c.cpk >= MIN_CPK:
+                self.capability_table.item(row, 7).setForeground(Qt.GlobalColor.red)
+        fill_table(
+            self.pareto_table,
+            [
+                [
+                    entry.description,
+                    str(entry.count),
+                    f"{entry.percent:.1f}",
+                    f"{entry.cumulative:.1f}",
+                ]
+                for entry in summary.pareto
+            ],
+        )
+        self.capability_table.resizeColumnsToContents()
+        self.pareto_table.resizeColumnsToContents()